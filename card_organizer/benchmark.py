@@ -0,0 +1,374 @@
+"""Offline benchmarks for the Card Inventory app.
+
+Runs each tab's rerun, card writes and exports against a synthetic inventory
+held in a FakeWorksheet (with optional simulated API latency and injected
+429/503 errors), using the same InventoryServices wiring as
+card_inventory_app.py, and writes the timings as JSON so runs can be
+compared across versions:
+
+    python benchmark.py --rows 1000 100000 --latency 0.3 --error-rate 0.05 --output results.json
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from card_search import describe_card
+from exports import export_inventory
+from fake_worksheet import FakeSpreadsheet, FakeWorksheet
+from inventory_frame import build_typed_inventory
+from inventory_query import InventoryTable
+from inventory_services import INVENTORY_PAGE_SIZE, UPDATE_PICKER_PAGE_SIZE, InventoryServices
+from profit_charts import build_profit_figures
+from rollups import CombinedRollups
+from synthetic_inventory import END_DATE, generate_sheet_values
+
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+DEFAULT_REPEAT = 5
+UNTHROTTLED_QUOTA = 10 ** 9
+SEARCH_QUERIES = ["mahomes", "topps chrome 2023", "prizm silver", "ohtni"]
+INVENTORY_QUERIES = [
+    dict(),
+    dict(filters={'Sport': 'Football', 'Sold': False}, sort_by='Purchase Price', ascending=False),
+    dict(filters={'Listed_flag': True}, sort_by='Date Purchased', page=3),
+]
+
+
+class VersionCache:
+    """Stand-in for st.cache_resource / st.cache_data keyed on the data version.
+
+    Keeps the `max_entries` most recently used results. With copy=True every
+    hit returns a pickled copy, as st.cache_data does.
+    """
+
+    def __init__(self, max_entries, copy=False):
+        self.max_entries = max_entries
+        self.copy = copy
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, key, compute):
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            value = self._entries[key]
+        else:
+            self.misses += 1
+            value = compute()
+            if self.copy:
+                value = pickle.dumps(value)
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return pickle.loads(value) if self.copy else value
+
+
+class BenchmarkApp:
+    """The app's InventoryServices over a FakeWorksheet, plus stand-ins for its version-keyed caches.
+
+    Each *_tab() method does the work of one rerun of that tab, minus the
+    Streamlit rendering itself.
+    """
+
+    def __init__(self, worksheet, snapshot_path=None):
+        self.worksheet = worksheet
+        FakeSpreadsheet([worksheet], latency=worksheet.latency)
+        # FakeWorksheet has no quota, so waiting for the real one would only hide the app's own timings
+        self.services = InventoryServices(worksheet, snapshot_path=snapshot_path, read_quota=UNTHROTTLED_QUOTA,
+                                          write_quota=UNTHROTTLED_QUOTA)
+        self.client = self.services.client
+        self.sync = self.services.sync
+        self.queue = self.services.write_queue
+        # Flushed explicitly through drain(), never by the background worker
+        self.queue.flush_interval = 3600
+        self.archive = self.services.archive
+        self.rollups = self.services.rollups
+        self.allocator = self.services.lot_allocator
+        self.search_index = self.services.search_index
+        self.typed_frames = VersionCache(2)
+        self.tables = VersionCache(2)
+        self.figures = VersionCache(8, copy=True)
+
+    def load(self):
+        """Top of every rerun: the current records."""
+        return self.sync.get_data()
+
+    def typed_frame(self, records, header, version):
+        """The typed frame for a version, built where a tab reads it (load_typed_inventory() in the app)."""
+        return self.typed_frames.get(version, lambda: build_typed_inventory(records, header))
+
+    def add_tab(self):
+        records, header, version = self.load()
+        if self.allocator.version != version:
+            self.allocator.ensure(self.typed_frame(records, header, version), version)
+        return self.allocator.peek()
+
+    def update_tab(self, query=""):
+        records, header, version = self.load()
+        self.search_index.ensure(records, version)
+        rows, _ = self.search_index.search(query, page=0, page_size=UPDATE_PICKER_PAGE_SIZE)
+        return [describe_card(records[row - 2], row) for row in rows if row < len(records) + 2]
+
+    def profit_tab(self, zoomed_out=False):
+        records, header, version = self.load()
+        df = self.typed_frame(records, header, version)
+        self.archive.load()
+        self.rollups.ensure(df, version)
+        rollups = CombinedRollups(self.rollups, self.archive.rollups)
+        totals = (rollups.total_spent, rollups.total_sold, rollups.total_profit)
+        rollups.totals_by('Sport')
+        figures = self.figures.get((version, self.archive.version, zoomed_out),
+                                   lambda: build_profit_figures(rollups, zoomed_out))
+        return totals, figures
+
+    def inventory_tab(self, filters=None, sort_by=None, ascending=True, page=0):
+        records, header, version = self.load()
+        df = self.typed_frame(records, header, version)
+        table = self.tables.get(version, lambda: InventoryTable(df, header))
+        return table.query(filters=filters, sort_by=sort_by, ascending=ascending, page=page,
+                           page_size=INVENTORY_PAGE_SIZE)
+
+    def add_card(self):
+        """Submits the Add form and writes the card to the sheet."""
+        self.add_tab()
+        lot_number = self.allocator.allocate()
+        self.queue.enqueue_append(["Benchmark Player", "Prizm", "Silver", "No", "No", 2024, "No", "eBay",
+                                   "seller_000", "$12.50", "2025-06-30", "No", lot_number])
+        self.queue.drain()
+
+    def update_card(self, row_number):
+        """Submits the sale form for one card and writes it to the sheet."""
+        self.queue.enqueue_update(row_number, {'Sold Date': "2025-06-30", 'Sold Price': "$20.00",
+                                               'Takeaway': "$17.40"})
+        self.queue.drain()
+
+    def api_calls(self):
+        return sum(self.worksheet.calls.values())
+
+    def retries(self):
+        return self.client.stats['retries']
+
+    def wait_for_sync(self):
+        while self.sync.reconciling:
+            time.sleep(0.01)
+
+
+class Benchmark:
+    """Runs the scenarios for one inventory size."""
+
+    def __init__(self, row_count, latency=0.0, seed=0, archive_days=None, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.values = generate_sheet_values(row_count, seed=seed)
+        self.random = random.Random(seed)
+        self.tmpdir = tempfile.mkdtemp(prefix="card-benchmark-")
+        self.snapshot_path = os.path.join(self.tmpdir, "inventory_snapshot.arrow")
+        # Errors are only injected once the setup below is done
+        self.app = self.new_app(self.snapshot_path, error_rate=0.0)
+        self.app.load()
+        self.archived_count = 0
+        if archive_days is not None:
+            # Cards sold more than `archive_days` before the newest purchase move to the archive worksheets
+            self.archived_count = self.app.archive.archive_sold_cards(self.app.sync,
+                                                                      END_DATE - timedelta(days=archive_days))
+            self.values = [list(row) for row in self.app.worksheet.values]
+        self.app.worksheet.error_rate = error_rate
+        self.row_count = len(self.values) - 1
+
+    def close(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def new_worksheet(self, error_rate=None):
+        return FakeWorksheet(self.values, latency=self.latency,
+                             error_rate=self.error_rate if error_rate is None else error_rate)
+
+    def new_app(self, snapshot_path=None, error_rate=None):
+        return BenchmarkApp(self.new_worksheet(error_rate), snapshot_path=snapshot_path)
+
+    def random_row(self):
+        return self.random.randint(2, self.row_count + 1)
+
+    def write_one(self):
+        """A card edit from another session, so the next rerun sees a new data version."""
+        self.app.update_card(self.random_row())
+
+    # --- Scenarios: (setup, run), setup's result is passed to run and not timed ---
+    def scenarios(self):
+        app = self.app
+
+        def warm(tab, **kwargs):
+            def setup():
+                tab(**kwargs)
+            return setup, lambda _: tab(**kwargs)
+
+        def after_write(tab, **kwargs):
+            return self.write_one, lambda _: tab(**kwargs)
+
+        def cold_app():
+            path = os.path.join(self.tmpdir, "cold.arrow")
+            if os.path.exists(path):
+                os.remove(path)
+            return self.new_app(path)
+
+        def snapshot_start(worksheet):
+            # self.app saved the snapshot when it loaded the sheet
+            started = BenchmarkApp(worksheet, snapshot_path=self.snapshot_path)
+            started.load()
+            return started
+
+        def export(file_format):
+            def run(_):
+                records, header, version = app.load()
+                return export_inventory(app.typed_frame(records, header, version)[header], file_format)
+            return None, run
+
+        return {
+            # The Add tab is where the app lands
+            'cold_start': (cold_app, lambda cold: cold.add_tab()),
+            'snapshot_start': (self.new_worksheet, snapshot_start),
+            'rerun_unchanged': warm(app.load),
+            'add_tab_rerun': warm(app.add_tab),
+            'add_tab_rerun_after_write': after_write(app.add_tab),
+            'update_tab_rerun': warm(app.update_tab),
+            'update_tab_search': (None, lambda _: [app.update_tab(query) for query in SEARCH_QUERIES]),
+            'update_tab_rerun_after_write': after_write(app.update_tab, query=SEARCH_QUERIES[0]),
+            'profit_tab_rerun': warm(app.profit_tab),
+            'profit_tab_rerun_zoomed_out': warm(app.profit_tab, zoomed_out=True),
+            'profit_tab_rerun_after_write': after_write(app.profit_tab),
+            'inventory_tab_rerun': warm(app.inventory_tab),
+            'inventory_tab_queries': (None, lambda _: [app.inventory_tab(**query) for query in INVENTORY_QUERIES]),
+            'inventory_tab_rerun_after_write': after_write(app.inventory_tab, **INVENTORY_QUERIES[1]),
+            'add_card': (None, lambda _: app.add_card()),
+            'update_card': (self.random_row, app.update_card),
+            'export_csv': export('CSV'),
+            'export_parquet': export('Parquet'),
+        }
+
+    def run(self, names=None, repeat=DEFAULT_REPEAT):
+        results = []
+        for name, (setup, run) in self.scenarios().items():
+            if names and name not in names:
+                continue
+            timings, api_calls, retries = [], 0, 0
+            failures_before = len(self.app.queue.failures)
+            try:
+                for _ in range(repeat):
+                    state = setup() if setup is not None else None
+                    calls_before, retries_before = self.app.api_calls(), self.app.retries()
+                    start = time.perf_counter()
+                    result = run(state)
+                    timings.append(time.perf_counter() - start)
+                    api_calls += self.app.api_calls() - calls_before
+                    retries += self.app.retries() - retries_before
+                    for started in (state, result):
+                        if isinstance(started, BenchmarkApp):
+                            started.wait_for_sync()
+                            api_calls += started.api_calls()
+                            retries += started.retries()
+            except ImportError as e:
+                results.append({'scenario': name, 'rows': self.row_count, 'skipped': str(e)})
+                continue
+            results.append({
+                'scenario': name,
+                'rows': self.row_count,
+                'archived_cards': self.archived_count,
+                'latency': self.latency,
+                'error_rate': self.error_rate,
+                'repeat': repeat,
+                'min': min(timings),
+                'median': statistics.median(timings),
+                'mean': statistics.fmean(timings),
+                'max': max(timings),
+                'timings': timings,
+                'api_calls_per_run': api_calls / repeat,
+                'retries_per_run': retries / repeat,
+                'failed_writes': len(self.app.queue.failures) - failures_before,
+            })
+        return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info():
+    try:
+        import pyarrow
+        pyarrow_version = pyarrow.__version__
+    except ImportError:
+        pyarrow_version = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'pyarrow': pyarrow_version,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS,
+                        help="inventory sizes to benchmark (default: %(default)s)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="simulated seconds per Sheets API call (default: %(default)s)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of Sheets API calls failing with 429 or 503, to time retries and backoff "
+                             "(default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="runs per scenario (default: %(default)s)")
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help="only run this scenario (can be given more than once)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic inventory")
+    parser.add_argument("--archive-days", type=int,
+                        help="archive cards sold more than this many days before the newest purchase first")
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for row_count in args.rows:
+        benchmark = Benchmark(row_count, latency=args.latency, seed=args.seed, archive_days=args.archive_days,
+                              error_rate=args.error_rate)
+        try:
+            row_results = benchmark.run(args.scenarios, args.repeat)
+        finally:
+            benchmark.close()
+        for result in row_results:
+            results.append(result)
+            if 'skipped' in result:
+                print(f"{result['rows']:>9} rows  {result['scenario']:<34} skipped: {result['skipped']}",
+                      file=sys.stderr)
+            else:
+                print(f"{result['rows']:>9} rows  {result['scenario']:<34} median {result['median'] * 1000:10.1f} ms"
+                      f"  api calls {result['api_calls_per_run']:.1f}  retries {result['retries_per_run']:.1f}",
+                      file=sys.stderr)
+
+    report = json.dumps({'environment': environment_info(), 'arguments': vars(args), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
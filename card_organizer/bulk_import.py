@@ -0,0 +1,195 @@
+import io
+from datetime import date
+
+import pandas as pd
+
+from card_definitions import baseball_parallels, baseball_sets, football_parallels, football_sets
+from write_queue import find_appended
+
+# Columns of an Inventory row in the order the Add tab writes them
+ROW_COLUMNS = ['Player Name', 'Set Name', 'Numbered', 'Auto', 'Patch', 'Year', 'Graded', 'Website',
+               'Seller Name', 'Purchase Price', 'Date Purchased', 'Listed', 'Lot Number']
+# Other headings accepted in uploaded files
+COLUMN_ALIASES = {
+    'player': 'Player Name', 'set': 'Set Name', 'parallel': 'Numbered', 'numbered/parallel': 'Numbered',
+    'bought from': 'Website', 'website (bought from)': 'Website', 'seller': 'Seller Name',
+    'purchase price ($)': 'Purchase Price', 'price': 'Purchase Price', 'date': 'Date Purchased',
+    'purchase date': 'Date Purchased', 'lot': 'Lot Number',
+}
+FLAG_COLUMNS = ['Auto', 'Patch', 'Graded', 'Listed']
+YES_VALUES = {'yes', 'y', 'true', '1', 'x'}
+NO_VALUES = {'no', 'n', 'false', '0', ''}
+PARALLELS_BY_SET = {**{name: baseball_parallels for name in baseball_sets},
+                    **{name: football_parallels for name in football_sets}}
+
+
+def read_import_file(name, data):
+    """Reads an uploaded CSV or Excel file into a frame of strings."""
+    if name.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(io.BytesIO(data), dtype=str)
+    else:
+        df = pd.read_csv(io.BytesIO(data), dtype=str, sep=None, engine='python')
+    return df.fillna('')
+
+
+def parse_pasted_table(text):
+    """Reads a table pasted from a spreadsheet (tab separated) or typed as CSV, with a header line."""
+    if not text.strip():
+        return pd.DataFrame(columns=ROW_COLUMNS)
+    sep = '\t' if '\t' in text.splitlines()[0] else None
+    return pd.read_csv(io.StringIO(text.strip()), dtype=str, sep=sep, engine='python').fillna('')
+
+
+def normalize_columns(df):
+    """Maps uploaded headings (any case, common aliases) to Inventory column names."""
+    known = {column.lower(): column for column in ROW_COLUMNS}
+    renamed = {}
+    for column in df.columns:
+        key = str(column).strip().lower()
+        renamed[column] = known.get(key) or COLUMN_ALIASES.get(key) or str(column).strip()
+    return df.rename(columns=renamed)
+
+
+def validate_import(df, is_lot_used=None, today=None):
+    """Checks uploaded cards and converts them to Inventory rows.
+
+    Returns (rows, errors): rows are lists in ROW_COLUMNS order for the cards
+    that passed, errors are (line number, message) pairs for the ones that
+    didn't. Cards without a lot number keep None in that column until
+    assign_lot_numbers() fills them in; `is_lot_used` rejects lot numbers that
+    are already taken.
+    """
+    today = today or date.today()
+    df = normalize_columns(df)
+    missing = [column for column in ['Player Name', 'Set Name'] if column not in df.columns]
+    if missing:
+        return [], [(0, f"Missing column(s): {', '.join(missing)}")]
+    for column in ROW_COLUMNS:
+        if column not in df.columns:
+            df[column] = ''
+
+    rows, errors = [], []
+    file_lots = set()
+    # Line numbers as the user sees them in the file (header on line 1)
+    for line, card in enumerate(df[ROW_COLUMNS].astype(str).itertuples(index=False, name=None), start=2):
+        card = dict(zip(ROW_COLUMNS, (value.strip() for value in card)))
+        problems = []
+        if not card['Player Name']:
+            problems.append("Player Name cannot be empty")
+
+        parallels = PARALLELS_BY_SET.get(card['Set Name'])
+        if parallels is None:
+            problems.append(f"Unknown set '{card['Set Name']}'")
+        numbered = card['Numbered'] or 'Base'
+        if parallels is not None and numbered not in parallels:
+            problems.append(f"'{numbered}' is not a parallel of {card['Set Name']}")
+
+        try:
+            year = int(float(card['Year'])) if card['Year'] else today.year
+            if not 1950 <= year <= today.year:
+                raise ValueError
+        except (ValueError, OverflowError):
+            problems.append(f"Invalid year '{card['Year']}'")
+            year = None
+
+        try:
+            price = float(card['Purchase Price'].replace('$', '').replace(',', '') or 0)
+            if not 0 <= price < float('inf'):
+                raise ValueError
+        except ValueError:
+            problems.append(f"Invalid purchase price '{card['Purchase Price']}'")
+            price = None
+
+        purchased = today
+        if card['Date Purchased']:
+            parsed = pd.to_datetime(card['Date Purchased'], errors='coerce')
+            if pd.isna(parsed):
+                problems.append(f"Invalid date '{card['Date Purchased']}'")
+            else:
+                purchased = parsed.date()
+
+        flags = {}
+        for column in FLAG_COLUMNS:
+            value = card[column].lower()
+            if value not in YES_VALUES | NO_VALUES:
+                problems.append(f"{column} must be Yes or No, not '{card[column]}'")
+            flags[column] = "Yes" if value in YES_VALUES else "No"
+
+        lot_number = None
+        if card['Lot Number']:
+            try:
+                lot_number = int(float(card['Lot Number']))
+            except (ValueError, OverflowError):
+                problems.append(f"Invalid lot number '{card['Lot Number']}'")
+            else:
+                if lot_number in file_lots or (is_lot_used is not None and is_lot_used(lot_number)):
+                    problems.append(f"Lot number {lot_number} is already used")
+                file_lots.add(lot_number)
+
+        if problems:
+            errors.extend((line, problem) for problem in problems)
+            continue
+        rows.append([card['Player Name'], card['Set Name'], numbered, flags['Auto'], flags['Patch'], year,
+                     flags['Graded'], card['Website'], card['Seller Name'], f"${price:.2f}", str(purchased),
+                     flags['Listed'], lot_number])
+    return rows, errors
+
+
+def count_unnumbered(rows):
+    """Number of validated rows still waiting for a lot number."""
+    return sum(1 for row in rows if row[-1] is None)
+
+
+def assign_lot_numbers(rows, first_lot_number):
+    """Returns the rows with missing lot numbers filled in consecutively from `first_lot_number`."""
+    numbered = []
+    next_lot_number = first_lot_number
+    for row in rows:
+        if row[-1] is None:
+            row = row[:-1] + [next_lot_number]
+            next_lot_number += 1
+        numbered.append(row)
+    return numbered
+
+
+class UnconfirmedImportError(Exception):
+    """Raised when a batch's append failed and it couldn't be checked whether its rows were written.
+
+    `rows` are the cards of that batch, which may be in the sheet.
+    """
+
+    def __init__(self, rows, error):
+        super().__init__(f"{error} (could not check whether the last {len(rows)} card(s) were written)")
+        self.rows = rows
+
+
+def import_rows(client, sync, rows, batch_size=100, progress=None):
+    """Appends rows to the sheet in append_rows batches of `batch_size`.
+
+    Each written batch is added to the local inventory copy right away, and
+    `progress(written, total)` is called after every batch. Returns the number
+    of rows written. A batch whose append failed is looked up by lot number
+    (write_queue.find_appended), since the request may have failed after the
+    rows were written: if it landed, the import carries on. Otherwise its
+    error is raised, or UnconfirmedImportError if the lookup failed too;
+    earlier batches stay written.
+    """
+    written = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        try:
+            response = client.append_rows(batch)
+            updated_range = (response or {}).get("updates", {}).get("updatedRange")
+        except Exception as e:
+            try:
+                landed_row = find_appended(client, sync.header, batch)
+            except Exception:
+                raise UnconfirmedImportError(batch, e) from e
+            if landed_row is None:
+                raise
+            updated_range = f"A{landed_row}"
+        sync.add_appended_rows(batch, updated_range)
+        written += len(batch)
+        if progress is not None:
+            progress(written, len(rows))
+    return written
@@ -0,0 +1,201 @@
+import re
+import threading
+
+import pandas as pd
+
+from inventory_frame import LOT_COLUMN, build_typed_inventory, parse_dates
+from rollups import InventoryRollups
+from sheet_sync import numericise
+from snapshot import load_snapshot, save_snapshot
+
+ARCHIVE_TITLE_FORMAT = "Archive {year}"
+ARCHIVE_TITLE_PATTERN = re.compile(r"^Archive (\d{4})$")
+# Recent sales stay in the Inventory worksheet so they can still be corrected
+ARCHIVE_MIN_AGE_DAYS = 30
+
+
+class CardArchive:
+    """Sold cards moved out of the Inventory worksheet into one archive worksheet per sale year.
+
+    Keeping sold cards out of Inventory makes every fetch, search, lot
+    number check and table query scale with the cards in stock instead of
+    every card ever bought. The Profit Tracker still covers them through
+    `rollups`, InventoryRollups over every archived card that are only
+    rebuilt when cards are archived (see rollups.CombinedRollups).
+
+    The archived rows are also kept in a local columnar file at `path` (the
+    snapshot.py format), so a restart doesn't have to re-read the archive
+    worksheets. Without that file load() reads them once. The file also
+    records the lot numbers of cards appended to the archive but not yet
+    deleted from Inventory, so a run that was interrupted in between can be
+    finished without archiving them twice.
+
+    Every sheet call, including listing and creating the archive
+    worksheets, goes through `client` (the Inventory SheetsClient), so it
+    counts against the quota and is retried like the app's other calls.
+    """
+
+    def __init__(self, client, path=None):
+        self.client = client
+        self.path = path
+        self.header = []
+        self.rows = []
+        self.version = 0
+        self.rollups = InventoryRollups()
+        self._keys = set()
+        # Lot numbers (as in the sheet) of cards copied to the archive but not yet deleted from Inventory
+        self._unfinished = set()
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    @property
+    def card_count(self):
+        return len(self.rows)
+
+    def load(self):
+        """Loads the archive from the local file, or from the archive worksheets if there is none."""
+        with self._lock:
+            if self._loaded:
+                return
+            snapshot = load_snapshot(self.path) if self.path else None
+            if snapshot is not None and snapshot[2].get("row_count") == len(snapshot[1]):
+                header, rows, watermark = snapshot
+                self._set(header, rows)
+                self._unfinished = set(watermark.get("unfinished", []))
+                self._rebuild_rollups()
+            else:
+                self.reload()
+            self._loaded = True
+
+    def reload(self):
+        """Re-reads every archive worksheet (one read per year) and refreshes the local file."""
+        with self._lock:
+            header, rows = [], []
+            for worksheet in self._archive_worksheets().values():
+                values = self.client.for_worksheet(worksheet).get_all_values()
+                if not values:
+                    continue
+                header = header or values[0]
+                rows.extend(self._align(values[0], row, header) for row in values[1:])
+            self._set(header, rows)
+            self._save()
+            self._rebuild_rollups()
+
+    def lot_numbers(self):
+        """Lot numbers of archived cards, which must never be handed out again."""
+        with self._lock:
+            if LOT_COLUMN not in self.header:
+                return set()
+            col = self.header.index(LOT_COLUMN)
+            lots = set()
+            for row in self.rows:
+                lot = numericise(row[col]) if col < len(row) else ""
+                if isinstance(lot, (int, float)) and float(lot).is_integer():
+                    lots.add(int(lot))
+            return lots
+
+    @staticmethod
+    def archivable_rows(header, rows, sold_before):
+        """Sheet row numbers of the rows sold before `sold_before` (a date), by sale year.
+
+        Cards without a lot number are left out: nothing could tell them apart
+        from an identical card archived earlier, so they stay in Inventory.
+        """
+        if 'Sold Date' not in header or LOT_COLUMN not in header:
+            return {}
+        col, lot_col = header.index('Sold Date'), header.index(LOT_COLUMN)
+        sold = parse_dates(pd.Series([row[col] for row in rows], dtype=object))
+        lots = pd.to_numeric(pd.Series([row[lot_col] for row in rows], dtype=object), errors='coerce')
+        sold = sold[(sold < pd.Timestamp(sold_before)) & (lots % 1 == 0)]
+        by_year = {}
+        for index, year in zip(sold.index, sold.dt.year):
+            by_year.setdefault(int(year), []).append(int(index) + 2)
+        return by_year
+
+    def archive_sold_cards(self, sync, sold_before):
+        """Moves Inventory rows sold before `sold_before` to their sale year's archive worksheet.
+
+        Inventory is re-read first so the rows are taken from what is really
+        in the sheet. Cards are appended to the archive before they are
+        deleted from Inventory, so a failure part-way never loses one (until
+        the next run deletes them, such cards count twice in the Profit
+        Tracker). Only cards a previous run copied but didn't get to delete
+        are skipped as already archived. The sync layer checks the rows still
+        hold the same cards before deleting them and reloads the sheet
+        afterwards, since every later Inventory row moves up
+        (InventorySync.delete_rows refuses to run while writes are queued).
+        Returns the number of cards moved.
+        """
+        with self._lock:
+            self.load()
+            sync.full_sync()
+            header, rows = sync.header, sync.rows
+            by_year = self.archivable_rows(header, rows, sold_before)
+            if not by_year:
+                return 0
+            if not self.header:
+                self.header = list(header)
+            lot_col = header.index(LOT_COLUMN)
+            lots = {rows[row_number - 2][lot_col] for row_numbers in by_year.values() for row_number in row_numbers}
+            interrupted = self._unfinished & lots
+            # Recorded before appending: a failed append may still have reached the archive
+            self._unfinished |= lots
+            self._save()
+
+            worksheets = self._archive_worksheets()
+            try:
+                for year, row_numbers in by_year.items():
+                    new_rows = []
+                    for row_number in row_numbers:
+                        row = self._align(header, rows[row_number - 2], self.header)
+                        if not (rows[row_number - 2][lot_col] in interrupted and tuple(row) in self._keys):
+                            new_rows.append(row)
+                    if not new_rows:
+                        continue
+                    if year not in worksheets:
+                        worksheets[year] = self.client.add_worksheet(ARCHIVE_TITLE_FORMAT.format(year=year), rows=1,
+                                                                     cols=len(self.header))
+                    client = self.client.for_worksheet(worksheets[year])
+                    # A worksheet left empty by an interrupted run still needs its header
+                    client.append_rows(new_rows if client.row_values(1) else [self.header] + new_rows)
+                    # Saved per year, so an interrupted run knows what already reached the archive
+                    self._set(self.header, self.rows + new_rows)
+                    self._save()
+            finally:
+                self._rebuild_rollups()
+
+            sync.delete_rows({row_number: rows[row_number - 2]
+                              for row_numbers in by_year.values() for row_number in row_numbers})
+            self._unfinished -= lots
+            self._save()
+            return sum(len(row_numbers) for row_numbers in by_year.values())
+
+    def _archive_worksheets(self):
+        """Archive worksheets by year, oldest first."""
+        worksheets = {}
+        for worksheet in self.client.worksheets():
+            match = ARCHIVE_TITLE_PATTERN.match(worksheet.title)
+            if match:
+                worksheets[int(match.group(1))] = worksheet
+        return dict(sorted(worksheets.items()))
+
+    def _set(self, header, rows):
+        self.header = list(header)
+        self.rows = rows
+        self._keys = {tuple(row) for row in rows}
+
+    def _rebuild_rollups(self):
+        records = [dict(zip(self.header, map(numericise, row))) for row in self.rows]
+        self.rollups.rebuild(build_typed_inventory(records, self.header))
+        self.version += 1
+
+    def _save(self):
+        if self.path:
+            save_snapshot(self.path, self.header, self.rows,
+                          {"row_count": len(self.rows), "unfinished": sorted(self._unfinished)})
+
+    @staticmethod
+    def _align(source_header, row, header):
+        """Reorders a row from `source_header` columns to `header` columns."""
+        values = dict(zip(source_header, row))
+        return [str(values.get(column, "")) for column in header]
@@ -0,0 +1,21 @@
+# --- Football Card Definitions ---
+football_sets = ["Prizm", "Optic", "Select", "Mosaic", "Contenders", "Spectra", "Unparalleled", "Black", "Flawless", "National Treasures"]
+football_parallels = [
+    "Base", "Silver", "Green", "Green Scope", "Green Wave", "Green Ice", "Orange", "Orange /249", "Orange Scope", 
+    "Orange Wave", "Orange Lazer", "Orange Ice", "Black & White Checker", "Red & Black Checker", "Red Pandora", 
+    "Red Stars", "Red Camo", "Red", "Black Pandora", "Dragon Scale", "/99", "Gold /10", "Gold Vinyl /5", 
+    "Green Shimmer /5", "Camo /25", "Hyper /25", "Red /299", "Blue /199","Purple /99", "Orange /75", "White /35", 
+    "White /25", "Red & Yellow /44", "White Knight /3", "Black Finite 1/1", "Black Stars 1/1", "Gold Shimmer /10", 
+    "Choice Nebula 1/1", "Downtown", "Manga (SSP)", "Color Blast (SSP)"
+]
+
+# --- Baseball Card Definitions ---
+baseball_sets = ["Topps Chrome", "Topps Chrome Update", "Topps Chrome Cosmic", "Topps Chrome Logofractor", "Bowman Chrome", "Bowman Paper", "Topps Series 1", "Topps Heritage", "Topps Diamond Icons", "Topps Heritage Mini", "Topps Opening Day", "Topps Inception", "Bowman Inception", "Topps Big League", "Topps Dynasty", "Topps Gypsy Queen", "Topps Archive Signature Edition", "Topps Tier One", "Topps Finest", "Topps Series 2", "Topps Stadium Club", "Topps Museum Collection", "Topps Japan Edition", "Topps Allen & Ginter", "Topps Gold Label", "Topps Black Chrome", "Topps Pristine", "Topps Chrome Platinum Anniversary", "Topps Update Series", "Topps Heritage High Number", "Topps Five Star", "Bowman's Best", "Topps Triple Threads", "Bowman Sapphire Edition", "Topps Chrome Pro Debut", "Topps Pro Debut", "Topps Finest Flashbacks", "Upper Deck"]
+baseball_parallels = ["Base", "/499", "/299", "/250", "/199", "/150", "/99", "/75", "/71", "/50", "/25", "/10", "/5", "1/1", "Image Variation", "Case Hit", "Insert", "Purple", "Raywave", "Refractor", "Xfractor"]
+
+SPORT_BY_SET = {**{name: "Baseball" for name in baseball_sets}, **{name: "Football" for name in football_sets}}
+
+
+def sport_for_set(set_name):
+    """Returns the sport a set name belongs to ('Other' for sets not in the lists above)."""
+    return SPORT_BY_SET.get(set_name, "Other")
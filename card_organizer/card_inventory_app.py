@@ -1,9 +1,23 @@
+import os
+
 import streamlit as st
 import gspread
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import date, timedelta
 import pandas as pd
-import plotly.express as px
+
+from bulk_import import (ROW_COLUMNS, UnconfirmedImportError, assign_lot_numbers, count_unnumbered, import_rows,
+                         parse_pasted_table, read_import_file, validate_import)
+from card_archive import ARCHIVE_MIN_AGE_DAYS
+from card_definitions import baseball_parallels, baseball_sets, football_parallels, football_sets
+from card_search import describe_card
+from exports import EXPORT_FORMATS, export_inventory
+from inventory_frame import LOT_NUMBER_COLUMN, build_typed_inventory, safe_float_conversion
+from inventory_query import InventoryTable
+from inventory_services import INVENTORY_PAGE_SIZE, UPDATE_PICKER_PAGE_SIZE, InventoryServices
+from perf_metrics import PerfMetrics, RerunProfile, note_cache_miss
+from profit_charts import build_profit_figures
+from rollups import CombinedRollups
 
 # --- Google Sheets Setup ---
 # The provided service account key file must be in the same directory as the script.
@@ -31,22 +45,175 @@ def get_worksheet():
 
 inventory_ws = get_worksheet()
 
-@st.cache_data(ttl=60)
+# Last synced inventory, so a restarted app renders before the sheet has been downloaded
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "inventory_snapshot.arrow")
+# Local columnar copy of the archive worksheets, so their totals are available without re-reading them
+ARCHIVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "card_archive.arrow")
+
+@st.cache_resource
+def get_inventory_services():
+    """Returns the process-wide sheet client, sync layer, write queue, archive and derived indexes."""
+    return InventoryServices(inventory_ws, snapshot_path=SNAPSHOT_PATH, archive_path=ARCHIVE_PATH)
+
+def get_sheets_client():
+    """Returns the process-wide quota-aware client that all sheet reads and writes go through."""
+    return get_inventory_services().client
+
+def get_inventory_sync():
+    """Returns the process-wide sync layer holding the local copy of the inventory."""
+    return get_inventory_services().sync
+
+def get_write_queue():
+    """Returns the process-wide queue that flushes card writes to the sheet in the background."""
+    return get_inventory_services().write_queue
+
 def get_inventory_data():
-    """Fetches all records and headers from the inventory worksheet."""
+    """Returns all records, headers and the data version, fetching only what changed in the worksheet.
+
+    The data version is bumped on every change to the records (sheet edits and
+    queued writes) and is the cache key for everything derived from them.
+    """
     if inventory_ws is None:
-        return [], []
+        return [], [], 0
+    sync = get_inventory_sync()
     try:
-        records = inventory_ws.get_all_records()
-        header = inventory_ws.row_values(1)
-        return records, header
+        return sync.get_data()
     except Exception as e:
         st.error(f"❌ Error loading inventory from Google Sheet: {e}")
-        return [], []
+        return sync.records, sync.header, sync.version
+
+@st.cache_resource(max_entries=2)
+def get_typed_inventory(data_version, _records, _header):
+    """Builds the typed inventory frame once per data version. Callers must not modify it."""
+    note_cache_miss('typed_inventory')
+    return build_typed_inventory(_records, _header)
+
+@st.cache_resource(max_entries=2)
+def get_inventory_table(data_version, _inventory_df, _header):
+    """Returns the filter/sort/page index over the typed inventory frame for one data version."""
+    note_cache_miss('inventory_table')
+    return InventoryTable(_inventory_df, _header)
+
+@st.cache_resource(max_entries=4)
+def get_inventory_export(data_version, export_name, file_format, _df, _columns=None):
+    """Serializes an export once per data version and format, so repeat downloads are free."""
+    note_cache_miss('inventory_export')
+    return export_inventory(_df if _columns is None else _df[_columns], file_format)
+
+def render_export_buttons(export_name, df, file_stem, columns=None):
+    """Offers CSV/Parquet downloads of a frame, serializing it only once the user asks for a file."""
+    requested_key = f'export_requested_{export_name}'
+    requested = st.session_state.get(requested_key)
+    for file_format, (extension, mime) in EXPORT_FORMATS.items():
+        if requested == (file_format, data_version):
+            try:
+                with rerun_profile.stage(f"{file_format} export", cache='inventory_export'):
+                    data = get_inventory_export(data_version, export_name, file_format, df, columns)
+            except ImportError as e:
+                st.info(f"{file_format} export needs an extra package: {e}")
+                continue
+            st.download_button(
+                label=f"⬇️ Download {file_format}",
+                data=data,
+                file_name=f'{file_stem}.{extension}',
+                mime=mime,
+                key=f'download_{export_name}_{extension}'
+            )
+        elif st.button(f"Prepare {file_format} Export", key=f'prepare_{export_name}_{extension}'):
+            st.session_state[requested_key] = (file_format, data_version)
+            st.rerun()
+
+def get_inventory_rollups():
+    """Returns the process-wide Profit Tracker rollups, patched by the sync layer on every change."""
+    return get_inventory_services().rollups
 
-def clear_inventory_cache():
-    """Clears the Streamlit cache for inventory data."""
-    st.cache_data.clear()
+def get_card_archive():
+    """Returns the process-wide archive of sold cards moved out of the Inventory worksheet."""
+    return get_inventory_services().archive
+
+@st.cache_data(max_entries=8)
+def get_profit_figures(data_version, archive_version, zoomed_out, _rollups):
+    """Builds the Profit Tracker figure specs once per data and archive version and zoom level."""
+    note_cache_miss('profit_figures')
+    return build_profit_figures(_rollups, zoomed_out)
+
+@st.cache_resource
+def get_lot_allocator():
+    """Returns the process-wide lot number allocator shared by every session."""
+    services = get_inventory_services()
+    if inventory_ws is not None:
+        # Archived cards keep their lot numbers
+        services.load_archive()
+    return services.lot_allocator
+
+def get_card_search_index():
+    """Returns the process-wide card search index, patched by the sync layer on every change."""
+    return get_inventory_services().search_index
+
+def expire_inventory_data():
+    """Makes the next load poll the sheet for changes.
+
+    Nothing is cleared globally: the fetch and every derived frame, index and
+    export are keyed by the sync layer's data version, so only layers whose
+    data actually changed are recomputed, and sessions on the current version
+    keep their caches.
+    """
+    if inventory_ws is not None:
+        get_inventory_sync().expire()
+
+@st.cache_resource
+def get_perf_metrics():
+    """Returns the process-wide rerun timings and counters shown in the debug panel.
+
+    Every rerun is also logged as a JSON line to CARD_APP_PERF_LOG and the
+    counters are exported in the Prometheus text format to
+    CARD_APP_METRICS_FILE, when those environment variables are set.
+    """
+    return PerfMetrics(log_path=os.environ.get("CARD_APP_PERF_LOG"),
+                       metrics_path=os.environ.get("CARD_APP_METRICS_FILE"))
+
+def render_perf_panel(rerun, metrics):
+    """Shows the last rerun's stage timings and the process-wide API and cache counters in the sidebar."""
+    with st.sidebar:
+        st.header("⏱️ Performance")
+        st.metric("Last rerun", f"{rerun['total_seconds'] * 1000:.0f} ms")
+        st.dataframe(pd.DataFrame({'Stage': list(rerun['stages']),
+                                   'ms': [seconds * 1000 for seconds in rerun['stages'].values()]}),
+                     hide_index=True, use_container_width=True)
+        if rerun['cache']:
+            st.caption("Cache: " + ", ".join(f"{name} {result}" for name, result in rerun['cache'].items()))
+        if rerun['api']:
+            st.caption(f"API this rerun: {rerun['api']['reads']} read(s), {rerun['api']['writes']} write(s), "
+                       f"{rerun['api']['api_seconds'] * 1000:.0f} ms")
+
+        if inventory_ws is not None:
+            sheets_client = get_sheets_client()
+            st.subheader("Sheets API")
+            for kind, (used, limit) in sheets_client.quota_usage().items():
+                st.progress(min(used / limit, 1.0), text=f"{kind.title()} quota: {used}/{limit} in the last minute")
+            st.dataframe(pd.DataFrame([
+                {'Method': method, 'Calls': stats['calls'], 'Errors': stats['errors'],
+                 'Avg ms': stats['seconds'] / stats['calls'] * 1000}
+                for method, stats in sorted(sheets_client.method_stats_copy().items())
+            ]), hide_index=True, use_container_width=True)
+            client_stats = sheets_client.stats
+            st.caption(f"{client_stats['retries']} retries, {client_stats['coalesced']} coalesced reads, "
+                       f"{client_stats['throttled_seconds']:.1f} s waiting for quota")
+            sync_stats = get_inventory_sync().stats
+            st.caption(f"{sync_stats['full_syncs']} full sync(s) ({sync_stats['full_sync_seconds']:.1f} s), "
+                       f"{sync_stats['incremental_syncs']} incremental ({sync_stats['incremental_sync_seconds']:.1f} s)")
+
+        st.subheader("Caches")
+        st.dataframe(pd.DataFrame([{'Cache': name, 'Hits': totals['hit'], 'Misses': totals['miss']}
+                                   for name, totals in sorted(metrics.cache_totals.items())]),
+                     hide_index=True, use_container_width=True)
+        st.subheader("Recent reruns")
+        st.dataframe(pd.DataFrame([{'Tab': recent['tab'], 'ms': recent['total_seconds'] * 1000}
+                                   for recent in reversed(metrics.recent)]),
+                     hide_index=True, use_container_width=True)
+
+# Stage timings of this rerun, for the debug panel and the performance log
+rerun_profile = RerunProfile(get_sheets_client() if inventory_ws is not None else None)
 
 # Initialize session state for refreshing data and tracking the current tab
 if 'refresh_data_needed' not in st.session_state:
@@ -54,362 +221,540 @@ if 'refresh_data_needed' not in st.session_state:
 if 'current_tab_index' not in st.session_state:
     st.session_state.current_tab_index = 0
 
-# Check if a data refresh is needed and clear the cache if so
+# Check if a data refresh is needed and poll the sheet if so
 if st.session_state.refresh_data_needed:
-    clear_inventory_cache()
+    expire_inventory_data()
     st.session_state.refresh_data_needed = False
-records, header = get_inventory_data()
+with rerun_profile.stage("sheet sync"):
+    records, header, data_version = get_inventory_data()
 
-st.set_page_config(page_title="Card Inventory Manager", layout="wide")
-st.title("📇 Trading Card Inventory App")
+def load_typed_inventory():
+    """Returns the typed frame of this rerun's records. Only called where the frame is read, so tabs that
+    don't need it (or whose indexes the sync listeners kept current) skip the rebuild after every write."""
+    with rerun_profile.stage("typed frame", cache='typed_inventory'):
+        return get_typed_inventory(data_version, records, header)
 
-tab_options = ["➕ Add New Card", "✏️ Update Card Information", "📊 Profit Tracker", "📋 Cards Inventory"]
-selected_tab = st.radio("Select View", tab_options, index=st.session_state.current_tab_index, horizontal=True)
-
-def safe_float_conversion(money_str):
-    """Safely converts a string with a dollar sign to a float."""
-    if isinstance(money_str, (int, float)):
-        return float(money_str)
-    if isinstance(money_str, str):
-        cleaned_str = money_str.replace('$', '').replace(',', '')
-        try:
-            return float(cleaned_str)
-        except ValueError:
-            return 0.0
-    return 0.0
-
-# --- Football Card Definitions ---
-football_sets = ["Prizm", "Optic", "Select", "Mosaic", "Contenders", "Spectra", "Unparalleled", "Black", "Flawless", "National Treasures"]
-football_parallels = [
-    "Base", "Silver", "Green", "Green Scope", "Green Wave", "Green Ice", "Orange", "Orange /249", "Orange Scope", 
-    "Orange Wave", "Orange Lazer", "Orange Ice", "Black & White Checker", "Red & Black Checker", "Red Pandora", 
-    "Red Stars", "Red Camo", "Red", "Black Pandora", "Dragon Scale", "/99", "Gold /10", "Gold Vinyl /5", 
-    "Green Shimmer /5", "Camo /25", "Hyper /25", "Red /299", "Blue /199","Purple /99", "Orange /75", "White /35", 
-    "White /25", "Red & Yellow /44", "White Knight /3", "Black Finite 1/1", "Black Stars 1/1", "Gold Shimmer /10", 
-    "Choice Nebula 1/1", "Downtown", "Manga (SSP)", "Color Blast (SSP)"
-]
-
-# --- Baseball Card Definitions ---
-baseball_sets = ["Topps Chrome", "Topps Chrome Update", "Topps Chrome Cosmic", "Topps Chrome Logofractor", "Bowman Chrome", "Bowman Paper", "Topps Series 1", "Topps Heritage", "Topps Diamond Icons", "Topps Heritage Mini", "Topps Opening Day", "Topps Inception", "Bowman Inception", "Topps Big League", "Topps Dynasty", "Topps Gypsy Queen", "Topps Archive Signature Edition", "Topps Tier One", "Topps Finest", "Topps Series 2", "Topps Stadium Club", "Topps Museum Collection", "Topps Japan Edition", "Topps Allen & Ginter", "Topps Gold Label", "Topps Black Chrome", "Topps Pristine", "Topps Chrome Platinum Anniversary", "Topps Update Series", "Topps Heritage High Number", "Topps Five Star", "Bowman's Best", "Topps Triple Threads", "Bowman Sapphire Edition", "Topps Chrome Pro Debut", "Topps Pro Debut", "Topps Finest Flashbacks", "Upper Deck"]
-baseball_parallels = ["Base", "/499", "/299", "/250", "/199", "/150", "/99", "/75", "/71", "/50", "/25", "/10", "/5", "1/1", "Image Variation", "Case Hit", "Insert", "Purple", "Raywave", "Refractor", "Xfractor"]
-
-
-# --- Tab 1: Add New Card ---
-if selected_tab == "➕ Add New Card":
-    st.header("➕ Add New Card Entry")
-
-    # --- Calculate next available Lot Number ---
-    current_lot_numbers = []
-    for record in records:
+try:
+    st.set_page_config(page_title="Card Inventory Manager", layout="wide")
+    st.title("📇 Trading Card Inventory App")
+
+    # --- Background sync and write status ---
+    if inventory_ws is not None:
+        inventory_sync = get_inventory_sync()
+        if inventory_sync.reconciling and inventory_sync.watermark:
+            st.caption(f"🔄 Showing inventory saved at {inventory_sync.watermark['synced_at']} while syncing with Google Sheet...")
+        elif inventory_sync.last_error is not None:
+            st.warning(f"⚠️ Background sync with Google Sheet failed, showing the last synced data: {inventory_sync.last_error}")
+
+        write_queue = get_write_queue()
+        pending_writes = write_queue.pending_count()
+        if pending_writes:
+            st.caption(f"⏳ Saving {pending_writes} change(s) to Google Sheet...")
+        if write_queue.failures:
+            for failure in write_queue.failures:
+                if failure['conflict']:
+                    st.warning(f"⚠️ Not saved, card was changed in the sheet: {failure['description']}")
+                else:
+                    st.error(f"❌ Failed to save to Google Sheet: {failure['description']} ({failure['error']})")
+            if st.button("Dismiss save errors"):
+                write_queue.clear_failures()
+                st.rerun()
+
+    tab_options = ["➕ Add New Card", "✏️ Update Card Information", "📊 Profit Tracker", "📋 Cards Inventory"]
+    selected_tab = st.radio("Select View", tab_options, index=st.session_state.current_tab_index, horizontal=True)
+    rerun_profile.tab = selected_tab.split(" ", 1)[1]
+
+    # --- Tab 1: Add New Card ---
+    if selected_tab == "➕ Add New Card":
+        st.header("➕ Add New Card Entry")
+
+        # --- Calculate next available Lot Number ---
         try:
-            lot_num = int(record.get('Lot Number', 0))
-            current_lot_numbers.append(lot_num)
-        except (ValueError, TypeError):
-            continue
-    
-    next_lot_number = 1
-    if current_lot_numbers:
-        next_lot_number = max(current_lot_numbers) + 1
-    # --- End Calculate next available Lot Number ---
-
-    # --- Sport Type Selection is placed OUTSIDE the form for reactivity ---
-    st.markdown("#### Select Card Sport")
-    sport_type = st.radio("Sport Type", ["Baseball", "Football"], index=0, horizontal=True, key='sport_type_selection')
-
-    if sport_type == "Baseball":
-        current_set_name_options = baseball_sets
-        current_numbered_parallel_options = baseball_parallels
-    else: # Football
-        current_set_name_options = football_sets
-        current_numbered_parallel_options = football_parallels
-    # --- End Sport Type Selection ---
-
-    with st.form(key='add_card_form'):
-        col1, col2, col3 = st.columns(3)
-
-        year_options = list(range(date.today().year, 1949, -1))
-
-        with col1:
-            st.markdown("#### Card Details")
-            player_name = st.text_input("Player Name")
-            # These selectboxes will use the options based on the sport_type selected above
-            card_set_name = st.selectbox("Set Name", current_set_name_options)
-            numbered_parallel = st.selectbox("Numbered/Parallel", current_numbered_parallel_options)
-            cb_auto, cb_patch, cb_graded, cb_listed = st.columns(4)
-            with cb_auto:
-                auto = st.checkbox("Auto")
-            with cb_patch:
-                patch = st.checkbox("Patch")
-            with cb_graded:
-                graded = st.checkbox("Graded") 
-            with cb_listed:
-                listed = st.checkbox("Listed")
-
-        with col2:
-            st.markdown("#### Purchase & Origin")
-            year = st.selectbox("Year", year_options)
-            bought_from = st.text_input("Website (Bought From)")
-            seller_name = st.text_input("Seller Name")
-
-        with col3:
-            st.markdown("#### Financials & ID")
-            purchase_price = st.number_input("Purchase Price ($)", min_value=0.0, format="%.2f")
-            purchase_date = st.date_input("Date Purchased", value=date.today())
-            lot_number = st.number_input("Lot Number", min_value=0, value=next_lot_number)
-
+            lot_allocator = get_lot_allocator()
+        except Exception as e:
+            # Without the archived lot numbers the allocator could hand one out again
+            st.error(f"❌ Error loading the card archive from Google Sheet: {e}")
+            st.info("Cards can be added once the archive loads. Try again in a moment.")
+            st.stop()
+        if lot_allocator.version != data_version:
+            # Only when its sync listener missed a version (e.g. a full resync)
+            inventory_df = load_typed_inventory()
+            with rerun_profile.stage("lot allocator"):
+                lot_allocator.ensure(inventory_df, data_version)
+        next_lot_number = lot_allocator.peek()
+        # --- End Calculate next available Lot Number ---
+
+        # --- Sport Type Selection is placed OUTSIDE the form for reactivity ---
+        st.markdown("#### Select Card Sport")
+        sport_type = st.radio("Sport Type", ["Baseball", "Football"], index=0, horizontal=True, key='sport_type_selection')
+
+        if sport_type == "Baseball":
+            current_set_name_options = baseball_sets
+            current_numbered_parallel_options = baseball_parallels
+        else: # Football
+            current_set_name_options = football_sets
+            current_numbered_parallel_options = football_parallels
+        # --- End Sport Type Selection ---
+
+        with st.form(key='add_card_form'):
+            col1, col2, col3 = st.columns(3)
+
+            year_options = list(range(date.today().year, 1949, -1))
+
+            with col1:
+                st.markdown("#### Card Details")
+                player_name = st.text_input("Player Name")
+                # These selectboxes will use the options based on the sport_type selected above
+                card_set_name = st.selectbox("Set Name", current_set_name_options)
+                numbered_parallel = st.selectbox("Numbered/Parallel", current_numbered_parallel_options)
+                cb_auto, cb_patch, cb_graded, cb_listed = st.columns(4)
+                with cb_auto:
+                    auto = st.checkbox("Auto")
+                with cb_patch:
+                    patch = st.checkbox("Patch")
+                with cb_graded:
+                    graded = st.checkbox("Graded") 
+                with cb_listed:
+                    listed = st.checkbox("Listed")
+
+            with col2:
+                st.markdown("#### Purchase & Origin")
+                year = st.selectbox("Year", year_options)
+                bought_from = st.text_input("Website (Bought From)")
+                seller_name = st.text_input("Seller Name")
+
+            with col3:
+                st.markdown("#### Financials & ID")
+                purchase_price = st.number_input("Purchase Price ($)", min_value=0.0, format="%.2f")
+                purchase_date = st.date_input("Date Purchased", value=date.today())
+                lot_number = st.number_input("Lot Number", min_value=0, value=next_lot_number)
+
+            st.write("---")
+            submitted = st.form_submit_button("Submit Card Entry")
+
+            if submitted:
+                if not player_name.strip():
+                    st.error("❗ Player Name cannot be empty.")
+                elif int(lot_number) != next_lot_number and not lot_allocator.claim(int(lot_number)):
+                    st.error(f"❗ Lot Number {int(lot_number)} is already used.")
+                else:
+                    if int(lot_number) == next_lot_number:
+                        # Another session may have taken the suggested number since this page rendered
+                        lot_number = lot_allocator.allocate()
+                    # --- REMOVED sport_type from the list of values to append ---
+                    row = [player_name, card_set_name, numbered_parallel, "Yes" if auto else "No", 
+                           "Yes" if patch else "No", year, "Yes" if graded else "No", bought_from, 
+                           seller_name, f"${purchase_price:.2f}", 
+                           str(purchase_date), "Yes" if listed else "No", int(lot_number)]
+                    try:
+                        if inventory_ws:
+                            get_write_queue().enqueue_append(row, description=f"Add {player_name} (Lot {int(lot_number)})")
+                            st.success("✅ Card entry added! Saving to Google Sheet in the background.")
+                            st.session_state.current_tab_index = 0
+                            st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Failed to queue card entry: {e}")
+
+        # --- Bulk Import ---
         st.write("---")
-        submitted = st.form_submit_button("Submit Card Entry")
-
-        if submitted:
-            if not player_name.strip():
-                st.error("❗ Player Name cannot be empty.")
-            else:
-                # --- REMOVED sport_type from the list of values to append ---
-                row = [player_name, card_set_name, numbered_parallel, "Yes" if auto else "No", 
-                       "Yes" if patch else "No", year, "Yes" if graded else "No", bought_from, 
-                       seller_name, f"${purchase_price:.2f}", 
-                       str(purchase_date), "Yes" if listed else "No", int(lot_number)]
-                try:
-                    if inventory_ws:
-                        inventory_ws.append_row(row)
-                        st.success("✅ Card entry added to Google Sheet!")
-                        st.session_state.refresh_data_needed = True
+        with st.expander("📥 Bulk Import Cards"):
+            st.caption("Upload a CSV or Excel file, or paste rows copied from a spreadsheet, with a header row "
+                       "using the Inventory column names. Cards without a lot number get one consecutive block.")
+            # Changing the widget keys empties the uploader and text area after an import
+            import_form_id = st.session_state.setdefault('bulk_import_form_id', 0)
+            if 'bulk_import_result' in st.session_state:
+                import_succeeded, import_message = st.session_state.pop('bulk_import_result')
+                if import_succeeded:
+                    st.success(import_message)
+                else:
+                    st.error(import_message)
+            uploaded_file = st.file_uploader("Cards File", type=['csv', 'xlsx', 'xls'], key=f'bulk_import_file_{import_form_id}')
+            pasted_table = st.text_area("Or Paste Cards", height=150, key=f'bulk_import_paste_{import_form_id}')
+            import_batch_size = st.number_input("Rows per Google Sheets Call", min_value=1, max_value=1000, value=100,
+                                                key='bulk_import_batch_size')
+
+            import_df = None
+            try:
+                if uploaded_file is not None:
+                    import_df = read_import_file(uploaded_file.name, uploaded_file.getvalue())
+                elif pasted_table.strip():
+                    import_df = parse_pasted_table(pasted_table)
+            except Exception as e:
+                st.error(f"❌ Could not read the cards: {e}")
+
+            if import_df is not None:
+                import_ready_rows, import_errors = validate_import(import_df, is_lot_used=lot_allocator.is_used)
+                if import_errors:
+                    st.warning(f"⚠️ {len(import_errors)} problem(s) found. Those cards will be skipped.")
+                    st.dataframe(pd.DataFrame(import_errors, columns=['Line', 'Problem']), hide_index=True)
+                if import_ready_rows:
+                    preview_rows = assign_lot_numbers(import_ready_rows[:100], next_lot_number)
+                    st.dataframe(pd.DataFrame(preview_rows, columns=ROW_COLUMNS),
+                                 use_container_width=True, hide_index=True)
+                    if st.button(f"Import {len(import_ready_rows)} Card(s)", key='bulk_import_submit') and inventory_ws:
+                        import_progress = st.progress(0.0, text="Importing cards...")
+                        imported_count = [0]
+
+                        def report_import_progress(written, total):
+                            imported_count[0] = written
+                            import_progress.progress(written / total, text=f"Imported {written} of {total} cards")
+
+                        claimed_lots, unconfirmed_rows = [], []
+                        try:
+                            for row in import_ready_rows:
+                                if row[-1] is not None:
+                                    if not lot_allocator.claim(row[-1]):
+                                        raise ValueError(f"Lot Number {row[-1]} is already used")
+                                    claimed_lots.append(row[-1])
+                            unnumbered_count = count_unnumbered(import_ready_rows)
+                            first_lot_number = lot_allocator.allocate(unnumbered_count)
+                            claimed_lots.extend(range(first_lot_number, first_lot_number + unnumbered_count))
+                            import_ready_rows = assign_lot_numbers(import_ready_rows, first_lot_number)
+                            import_rows(get_sheets_client(), get_inventory_sync(), import_ready_rows,
+                                        batch_size=int(import_batch_size), progress=report_import_progress)
+                            st.session_state.bulk_import_result = (
+                                True, f"✅ Imported {imported_count[0]} card(s) to Google Sheet!")
+                        except UnconfirmedImportError as e:
+                            # The last batch may be in the sheet, so its lot numbers stay taken
+                            unconfirmed_rows = e.rows
+                            written_lots = {row[-1] for row in import_ready_rows[:imported_count[0]] + e.rows}
+                            lot_allocator.release(set(claimed_lots) - written_lots)
+                            get_inventory_sync().expire()
+                            st.session_state.bulk_import_result = (
+                                False, f"❌ Import stopped after {imported_count[0]} card(s): {e}. Check the sheet "
+                                       f"for the next {len(e.rows)} card(s) before importing the rest.")
+                        except Exception as e:
+                            # Lot numbers of the cards that weren't written are free again
+                            written_lots = {row[-1] for row in import_ready_rows[:imported_count[0]]}
+                            lot_allocator.release(set(claimed_lots) - written_lots)
+                            st.session_state.bulk_import_result = (
+                                False, f"❌ Import stopped after {imported_count[0]} card(s): {e}")
+                        # Once cards may have been written the input is cleared, so clicking Import again can't
+                        # add them twice
+                        if imported_count[0] or unconfirmed_rows:
+                            st.session_state.bulk_import_form_id = import_form_id + 1
                         st.session_state.current_tab_index = 0
                         st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Failed to write to Google Sheet: {e}")
-
-# --- Tab 2: Update Card Information ---
-elif selected_tab == "✏️ Update Card Information":
-    st.header("✏️ Update Card Information")
-
-    card_options = ["--- Select a Card to Update ---"]
-    card_gsheet_row_map = {}
-    card_current_data_map = {}
-
-    if not records:
-        st.info("No cards found in inventory to update.")
-    else:
-        for i, record in enumerate(records):
-            gsheet_row_number = i + 2
-            # --- REMOVED sport type from the display name for new records ---
-            display_name = f"{record.get('Player Name', 'N/A')} - {record.get('Year', 'N/A')} - {record.get('Set Name', 'N/A')} - {record.get('Numbered', 'N/A')} - {record.get('Purchase Price', 'N/A')} (Row {gsheet_row_number})"
-            card_options.append(display_name)
-            card_gsheet_row_map[display_name] = gsheet_row_number
-            card_current_data_map[display_name] = record
-
-    selected_card_display = st.selectbox("Select Card to Update", card_options, key='update_card_select')
-
-    if selected_card_display != "--- Select a Card to Update ---":
-        selected_gsheet_row_index = card_gsheet_row_map.get(selected_card_display)
-        current_record = card_current_data_map.get(selected_card_display, {})
-
-        # --- New Form for Status Updates ---
-        st.markdown("#### Update Status")
-        with st.form(key='update_status_form'):
-            col_listed, col_graded, _ = st.columns([1, 1, 6]) 
-            with col_listed:
-                current_listed_status = current_record.get('Listed', 'No') == 'Yes'
-                new_listed_status = st.checkbox("Is Listed?", value=current_listed_status, key='listed_checkbox')
-            with col_graded:
-                current_graded_status = current_record.get('Graded', 'No') == 'Yes'
-                new_graded_status = st.checkbox("Is Graded?", value=current_graded_status, key='graded_checkbox')
-            
-            status_update_submitted = st.form_submit_button("Update Card Status")
-
-            if status_update_submitted and inventory_ws:
-                try:
-                    cells_to_update = []
-                    
-                    listed_col = header.index('Listed') + 1
-                    new_listed_value = "Yes" if new_listed_status else "No"
-                    cells_to_update.append(gspread.Cell(selected_gsheet_row_index, listed_col, new_listed_value))
-
-                    graded_col = header.index('Graded') + 1
-                    new_graded_value = "Yes" if new_graded_status else "No"
-                    cells_to_update.append(gspread.Cell(selected_gsheet_row_index, graded_col, new_graded_value))
-                    
-                    inventory_ws.update_cells(cells_to_update)
-                    st.success("✅ Card status updated!")
-                    st.session_state.refresh_data_needed = True
-                    st.session_state.current_tab_index = 1
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Error updating card status: {e}")
-
-        # --- Original Form for Sale Information ---
-        st.markdown("#### Update Sale Information")
-        with st.form(key='update_sale_info_form'):
-            sold_date_val = pd.to_datetime(current_record.get('Sold Date')).date() if 'Sold Date' in current_record and current_record.get('Sold Date') else date.today()
-            sold_price_val = safe_float_conversion(current_record.get('Sold Price', 0.0))
-            sale_takeaway_val = safe_float_conversion(current_record.get('Takeaway', 0.0))
-
-            sold_date = st.date_input("Sold Date", value=sold_date_val)
-            sold_price = st.number_input("Sold Price ($)", min_value=0.0, format="%.2f", value=sold_price_val)
-            sale_takeaway = st.number_input("Takeaway from Sale ($)", min_value=0.0, format="%.2f", value=sale_takeaway_val)
-            
-            sale_update_submitted = st.form_submit_button("Update Sale Information")
-
-            if sale_update_submitted and inventory_ws:
-                try:
-                    cells_to_update = []
-                    
-                    sold_date_col = header.index('Sold Date') + 1
-                    sold_price_col = header.index('Sold Price') + 1
-                    takeaway_col = header.index('Takeaway') + 1
-                    cells_to_update.append(gspread.Cell(selected_gsheet_row_index, sold_date_col, str(sold_date)))
-                    cells_to_update.append(gspread.Cell(selected_gsheet_row_index, sold_price_col, f"${sold_price:.2f}"))
-                    cells_to_update.append(gspread.Cell(selected_gsheet_row_index, takeaway_col, f"${sale_takeaway:.2f}"))
-                    
-                    inventory_ws.update_cells(cells_to_update)
-                    st.success("✅ Sale information updated!")
-                    st.session_state.refresh_data_needed = True
-                    st.session_state.current_tab_index = 1
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"❌ Error updating sale info: {e}")
-
-# --- Tab 3: Profit Tracker ---
-elif selected_tab == "📊 Profit Tracker":
-    st.header("📊 Profit Tracker")
-    if st.button("Refresh Profit Data"):
-        st.session_state.refresh_data_needed = True
-        st.session_state.current_tab_index = 2
-        st.rerun()
-
-    if not records:
-        st.info("No records to calculate profit from.")
-    else:
-        try:
-            df = pd.DataFrame(records)
-            df['Purchase Price_num'] = df['Purchase Price'].apply(safe_float_conversion)
-            df['Sold Price_num'] = df['Sold Price'].apply(safe_float_conversion)
-            df['Takeaway_num'] = df['Takeaway'].apply(safe_float_conversion)
-            df['Purchase Date_dt'] = pd.to_datetime(df['Date Purchased'], errors='coerce')
-            df['Sold Date_dt'] = pd.to_datetime(df['Sold Date'], errors='coerce')
-
-            df['Profit_Per_Item'] = df.apply(
-                lambda row: row['Takeaway_num'] - row['Purchase Price_num']
-                if pd.notna(row['Sold Date_dt']) else 0,
-                axis=1
-            )
-
-            total_spent = sum(df['Purchase Price_num'])
-            total_sold = sum(df['Sold Price_num'])
-            total_profit = df['Profit_Per_Item'].sum()
 
-            st.metric("Total Spent", f"${total_spent:.2f}")
-            st.metric("Total Sold", f"${total_sold:.2f}")
-            st.metric("Total Profit", f"${total_profit:.2f}")
-
-            st.download_button(
-                label="⬇️ Download Inventory as CSV",
-                data=df.to_csv(index=False).encode('utf-8'),
-                file_name='card_inventory.csv',
-                mime='text/csv'
+    # --- Tab 2: Update Card Information ---
+    elif selected_tab == "✏️ Update Card Information":
+        st.header("✏️ Update Card Information")
+
+        selected_gsheet_row_index = None
+        current_record = {}
+
+        if not records:
+            st.info("No cards found in inventory to update.")
+        else:
+            search_index = get_card_search_index()
+            with rerun_profile.stage("search index"):
+                search_index.ensure(records, data_version)
+
+            search_query = st.text_input("Search Cards", placeholder="Player, year, set, parallel or lot number",
+                                         key='update_card_search')
+            if st.session_state.get('update_card_last_query') != search_query:
+                st.session_state.update_card_page = 0
+                st.session_state.update_card_last_query = search_query
+
+            col_prev, col_page_info, col_next = st.columns([1, 4, 1])
+            with col_prev:
+                if st.button("◀ Previous", key='update_card_prev'):
+                    st.session_state.update_card_page -= 1
+            with col_next:
+                if st.button("Next ▶", key='update_card_next'):
+                    st.session_state.update_card_page += 1
+
+            page_number = max(st.session_state.update_card_page, 0)
+            with rerun_profile.stage("search"):
+                matching_rows, match_count = search_index.search(search_query, page=page_number,
+                                                                 page_size=UPDATE_PICKER_PAGE_SIZE)
+                page_count = max(1, -(-match_count // UPDATE_PICKER_PAGE_SIZE))
+                if page_number >= page_count:
+                    page_number = page_count - 1
+                    matching_rows, match_count = search_index.search(search_query, page=page_number,
+                                                                     page_size=UPDATE_PICKER_PAGE_SIZE)
+            st.session_state.update_card_page = page_number
+            with col_page_info:
+                st.caption(f"{match_count} matching card(s) - page {page_number + 1} of {page_count}")
+
+            def row_in_records(row):
+                # The index is shared and patched from other threads, so it can already hold rows (e.g. another
+                # session's pending add) past the records of this rerun
+                return row if row is not None and 2 <= row < len(records) + 2 else None
+
+            def describe_card_key(key):
+                row = row_in_records(search_index.row_for_key(key)) if key is not None else None
+                return "--- Select a Card to Update ---" if row is None else describe_card(records[row - 2], row)
+
+            matching_rows = [row for row in matching_rows if row_in_records(row) is not None]
+
+            # Cards are picked by lot number, so the selection stays on the same card when rows move up
+            selected_card_key = st.selectbox(
+                "Select Card to Update", [None] + [search_index.card_key(row) for row in matching_rows],
+                key='update_card_select', format_func=describe_card_key
             )
-
-            st.markdown("---")
-
-            st.subheader("📦 Inventory Status")
-            status_data = pd.DataFrame({
-                'Status': ['In Inventory', 'Sold'],
-                'Count': [df['Sold Date_dt'].isna().sum(), df['Sold Date_dt'].notna().sum()]
-            })
-            fig_inventory = px.pie(status_data, values='Count', names='Status',
-                                   title='Inventory vs. Sold', hole=0.3, template='plotly_white',
-                                   hover_data={'Count': False, 'Status': False})
-            fig_inventory.update_traces(hovertemplate='Status: %{label}<br>Count: %{value}<extra></extra>')
-            fig_inventory.update_traces(textinfo='percent+label', textposition='outside',
-                                         texttemplate='%{label}<br>%{percent}')
-            fig_inventory.update_layout(uniformtext_minsize=10, uniformtext_mode='hide')
-            st.plotly_chart(fig_inventory, use_container_width=True)
+            if selected_card_key is not None:
+                selected_gsheet_row_index = row_in_records(search_index.row_for_key(selected_card_key))
+            if selected_gsheet_row_index is not None:
+                current_record = records[selected_gsheet_row_index - 2]
+
+        if selected_gsheet_row_index is not None:
+            # --- New Form for Status Updates ---
+            st.markdown("#### Update Status")
+            with st.form(key='update_status_form'):
+                col_listed, col_graded, _ = st.columns([1, 1, 6]) 
+                with col_listed:
+                    current_listed_status = current_record.get('Listed', 'No') == 'Yes'
+                    new_listed_status = st.checkbox("Is Listed?", value=current_listed_status, key='listed_checkbox')
+                with col_graded:
+                    current_graded_status = current_record.get('Graded', 'No') == 'Yes'
+                    new_graded_status = st.checkbox("Is Graded?", value=current_graded_status, key='graded_checkbox')
             
-            st.markdown("---")
-
-            st.subheader("📈 Daily Spending")
-            spending_data = df.dropna(subset=['Purchase Date_dt']).copy()
-            spending_data['Purchase Day'] = spending_data['Purchase Date_dt'].dt.date
-            daily_spending = spending_data.groupby('Purchase Day')['Purchase Price_num'].sum().reset_index()
-
-            if not daily_spending.empty:
-                fig_spending = px.bar(daily_spending, x='Purchase Day', y='Purchase Price_num',
-                                       title='Total Spending Per Day', template='plotly_white',
-                                       hover_data={'Purchase Day': False, 'Purchase Price_num': False}) 
-                fig_spending.update_traces(hovertemplate='Date: %{x}<br>Total Spent: $%{y:.2f}<extra></extra>')
-                fig_spending.update_layout(hovermode="x unified") 
-
-                if not daily_spending['Purchase Day'].empty:
-                    max_date = daily_spending['Purchase Day'].max()
-                    min_date_2_months_ago = max_date - timedelta(days=60)
-                    fig_spending.update_xaxes(range=[min_date_2_months_ago, max_date])
-
-                st.plotly_chart(fig_spending, use_container_width=True)
-            else:
-                st.info("No purchase data for daily chart.")
-
-            st.markdown("---")
-
-            st.subheader("📈 Monthly Spending")
-            spending_data_monthly = df.dropna(subset=['Purchase Date_dt']).copy()
-            spending_data_monthly = spending_data_monthly.sort_values(by='Purchase Date_dt')
-            spending_data_monthly['Purchase Month'] = spending_data_monthly['Purchase Date_dt'].dt.strftime('%b %Y')
-            monthly_spending = spending_data_monthly.groupby('Purchase Month')['Purchase Price_num'].sum().reset_index()
-
-            if not monthly_spending.empty:
-                monthly_spending['Sort Key'] = pd.to_datetime(monthly_spending['Purchase Month'], format='%b %Y')
-                monthly_spending = monthly_spending.sort_values(by='Sort Key').drop(columns='Sort Key')
-
-                fig_monthly_spending = px.bar(monthly_spending, x='Purchase Month', y='Purchase Price_num',
-                                               title='Total Spending Per Month', template='plotly_white',
-                                               hover_data={'Purchase Month': False})
-                fig_monthly_spending.update_traces(hovertemplate='Month: %{x}<br>Total Spent: $%{y:.2f}<extra></extra>')
-                fig_monthly_spending.update_layout(hovermode="x unified")
-
-                if not monthly_spending['Purchase Month'].empty:
-                    monthly_dates = pd.to_datetime(monthly_spending['Purchase Month'], format='%b %Y')
-                    max_month_date = monthly_dates.max()
-                    min_month_date_2_years_ago = max_month_date - timedelta(days=2*365)
-                    fig_monthly_spending.update_xaxes(range=[min_month_date_2_years_ago, max_month_date])
-
-                st.plotly_chart(fig_monthly_spending, use_container_width=True)
-            else:
-                st.info("No purchase data for monthly chart.")
-
-            st.markdown("---")
-
-            st.subheader("💰 Cumulative Profit Trend")
-            profit_trend_data = df.dropna(subset=['Sold Date_dt']).copy()
-            profit_trend_data = profit_trend_data.sort_values(by='Sold Date_dt')
+                status_update_submitted = st.form_submit_button("Update Card Status")
+
+                if status_update_submitted and inventory_ws:
+                    try:
+                        get_write_queue().enqueue_update(
+                            selected_gsheet_row_index,
+                            {'Listed': "Yes" if new_listed_status else "No",
+                             'Graded': "Yes" if new_graded_status else "No"},
+                            description=f"Status of {current_record.get('Player Name', 'N/A')} (Row {selected_gsheet_row_index})"
+                        )
+                        st.success("✅ Card status updated!")
+                        st.session_state.current_tab_index = 1
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error updating card status: {e}")
+
+            # --- Original Form for Sale Information ---
+            st.markdown("#### Update Sale Information")
+            with st.form(key='update_sale_info_form'):
+                sold_date_val = pd.to_datetime(current_record.get('Sold Date')).date() if 'Sold Date' in current_record and current_record.get('Sold Date') else date.today()
+                sold_price_val = safe_float_conversion(current_record.get('Sold Price', 0.0))
+                sale_takeaway_val = safe_float_conversion(current_record.get('Takeaway', 0.0))
+
+                sold_date = st.date_input("Sold Date", value=sold_date_val)
+                sold_price = st.number_input("Sold Price ($)", min_value=0.0, format="%.2f", value=sold_price_val)
+                sale_takeaway = st.number_input("Takeaway from Sale ($)", min_value=0.0, format="%.2f", value=sale_takeaway_val)
             
-            daily_profit_sum = profit_trend_data.groupby('Sold Date_dt')['Profit_Per_Item'].sum().reset_index()
-            daily_profit_sum['Cumulative Profit'] = daily_profit_sum['Profit_Per_Item'].cumsum()
-
-            if not daily_profit_sum.empty:
-                fig_profit = px.line(daily_profit_sum, x='Sold Date_dt', y='Cumulative Profit',
-                                       title='Cumulative Profit Trend Over Time', template='plotly_white', markers=True,
-                                       hover_data={'Sold Date_dt': False}) 
-                fig_profit.update_traces(hovertemplate='Date: %{x|%b %d, %Y}<br>Cumulative Profit: $%{y:.2f}<extra></extra>')
-                fig_profit.update_layout(hovermode="x unified", hoverlabel_namelength=-1)
-                st.plotly_chart(fig_profit, use_container_width=True)
-            else:
-                st.info("No profit data for cumulative chart.")
-
-        except Exception as e:
-            st.error(f"❌ Error generating charts: {e}")
-
-# --- Tab 4: Cards Inventory ---
-elif selected_tab == "📋 Cards Inventory":
-    st.header("📋 All Cards in Inventory")
-    if not records:
-        st.info("No cards found in inventory.")
-    else:
-        df_all_cards = pd.DataFrame(records)
-        st.dataframe(df_all_cards, use_container_width=True, height=600)
-
-        st.download_button(
-            label="⬇️ Download All Cards as CSV",
-            data=df_all_cards.to_csv(index=False).encode('utf-8'),
-            file_name='all_cards_inventory.csv',
-            mime='text/csv'
-        )
+                sale_update_submitted = st.form_submit_button("Update Sale Information")
+
+                if sale_update_submitted and inventory_ws:
+                    try:
+                        get_write_queue().enqueue_update(
+                            selected_gsheet_row_index,
+                            {'Sold Date': str(sold_date),
+                             'Sold Price': f"${sold_price:.2f}",
+                             'Takeaway': f"${sale_takeaway:.2f}"},
+                            description=f"Sale of {current_record.get('Player Name', 'N/A')} (Row {selected_gsheet_row_index})"
+                        )
+                        st.success("✅ Sale information updated!")
+                        st.session_state.current_tab_index = 1
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error updating sale info: {e}")
+
+    # --- Tab 3: Profit Tracker ---
+    elif selected_tab == "📊 Profit Tracker":
+        st.header("📊 Profit Tracker")
+        if st.button("Refresh Profit Data"):
+            try:
+                if inventory_ws is not None:
+                    # The user asked for fresh data, so wait for it rather than reconcile in the background
+                    with st.spinner("Reloading inventory from Google Sheet..."):
+                        get_inventory_sync().refresh()
+                st.session_state.current_tab_index = 2
+                st.rerun()
+            except Exception as e:
+                st.error(f"❌ Error reloading inventory from Google Sheet: {e}")
+
+        # Sold cards moved to the archive worksheets count through their precomputed totals
+        card_archive = get_card_archive() if inventory_ws is not None else None
+        if card_archive is not None:
+            try:
+                with rerun_profile.stage("archive"):
+                    card_archive.load()
+            except Exception as e:
+                st.error(f"❌ Error loading the card archive from Google Sheet, showing the inventory only: {e}")
+                card_archive = None
+
+        inventory_df = load_typed_inventory()
+        if not records and not (card_archive and card_archive.card_count):
+            st.info("No records to calculate profit from.")
+        else:
+            try:
+                df = inventory_df
+                live_rollups = get_inventory_rollups()
+                with rerun_profile.stage("rollups"):
+                    live_rollups.ensure(df, data_version)
+                rollups = CombinedRollups(live_rollups, card_archive.rollups) if card_archive is not None else live_rollups
+                archive_version = card_archive.version if card_archive is not None else 0
+
+                st.metric("Total Spent", f"${rollups.total_spent:.2f}")
+                st.metric("Total Sold", f"${rollups.total_sold:.2f}")
+                st.metric("Total Profit", f"${rollups.total_profit:.2f}")
+
+                totals_group = st.radio("Totals by", ["Sport", "Set", "Seller"], horizontal=True, key='totals_group')
+                with rerun_profile.stage("group totals"):
+                    group_totals = rollups.totals_by(totals_group)
+                st.dataframe(group_totals, use_container_width=True, hide_index=True,
+                             column_config={column: st.column_config.NumberColumn(format="$%.2f")
+                                            for column in ['Total Spent', 'Total Sold', 'Total Profit']})
+
+                render_export_buttons('profit', df, 'card_inventory')
+
+                st.markdown("---")
+
+                zoomed_out = st.toggle("Show full history", key='profit_zoomed_out',
+                                       help="Show every month and day instead of the last 2 years / 60 days.")
+                with rerun_profile.stage("profit figures", cache='profit_figures'):
+                    profit_figures = get_profit_figures(data_version, archive_version, zoomed_out, rollups)
+
+                with rerun_profile.stage("render charts"):
+                    st.subheader("📦 Inventory Status")
+                    st.plotly_chart(profit_figures['status'], use_container_width=True)
+
+                    st.markdown("---")
+
+                    st.subheader("📈 Daily Spending")
+                    if profit_figures['daily'] is not None:
+                        st.plotly_chart(profit_figures['daily'], use_container_width=True)
+                    else:
+                        st.info("No purchase data for daily chart.")
+
+                    st.markdown("---")
+
+                    st.subheader("📈 Monthly Spending")
+                    if profit_figures['monthly'] is not None:
+                        st.plotly_chart(profit_figures['monthly'], use_container_width=True)
+                    else:
+                        st.info("No purchase data for monthly chart.")
+
+                    st.markdown("---")
+
+                    st.subheader("💰 Cumulative Profit Trend")
+                    if profit_figures['profit'] is not None:
+                        st.plotly_chart(profit_figures['profit'], use_container_width=True)
+                    else:
+                        st.info("No profit data for cumulative chart.")
+
+            except Exception as e:
+                st.error(f"❌ Error generating charts: {e}")
+
+        if card_archive is not None:
+            st.markdown("---")
+            with st.expander("🗄️ Archive Sold Cards"):
+                st.caption(f"{card_archive.card_count} sold card(s) are in the yearly archive worksheets. They count "
+                           "toward the Profit Tracker but are no longer loaded, searched or listed with the inventory. "
+                           "Cards without a lot number stay in the inventory.")
+                min_age_days = st.number_input("Archive cards sold more than this many days ago", min_value=0,
+                                               value=ARCHIVE_MIN_AGE_DAYS, step=1, key='archive_min_age_days')
+                sold_before = date.today() - timedelta(days=int(min_age_days))
+                # Cards without a lot number are never archived (see CardArchive.archivable_rows)
+                archivable_count = int(((inventory_df['Sold Date_dt'] < pd.Timestamp(sold_before))
+                                        & inventory_df[LOT_NUMBER_COLUMN].notna()).sum()) if records else 0
+                if st.button(f"Archive {archivable_count} Sold Card(s)", disabled=archivable_count == 0,
+                             key='archive_sold_cards'):
+                    if get_write_queue().pending_count():
+                        st.warning("⏳ Wait until all changes are saved to Google Sheet before archiving.")
+                    else:
+                        try:
+                            with st.spinner("Moving sold cards to the archive worksheets..."):
+                                archived_count = card_archive.archive_sold_cards(get_inventory_sync(), sold_before)
+                            st.success(f"✅ Archived {archived_count} sold card(s).")
+                            st.session_state.current_tab_index = 2
+                            st.rerun()
+                        except Exception as e:
+                            st.error(f"❌ Error archiving sold cards: {e}")
+                if st.button("Reload Archive from Google Sheet", key='reload_archive'):
+                    try:
+                        card_archive.reload()
+                        st.session_state.current_tab_index = 2
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"❌ Error reloading the archive: {e}")
+
+    # --- Tab 4: Cards Inventory ---
+    elif selected_tab == "📋 Cards Inventory":
+        st.header("📋 All Cards in Inventory")
+        if not records:
+            st.info("No cards found in inventory.")
+        else:
+            inventory_df = load_typed_inventory()
+            with rerun_profile.stage("inventory table", cache='inventory_table'):
+                inventory_table = get_inventory_table(data_version, inventory_df, header)
+
+            # --- Filters and sorting ---
+            yes_no = {"All": None, "Yes": True, "No": False}
+            col_sport, col_set, col_listed, col_graded, col_sold = st.columns(5)
+            with col_sport:
+                sport_filter = st.selectbox("Sport", ["All", "Baseball", "Football", "Other"], key='inventory_sport')
+            with col_set:
+                set_filter = st.selectbox("Set Name", ["All"] + sorted(inventory_df['Set Name'].cat.categories)
+                                          if 'Set Name' in inventory_df else ["All"], key='inventory_set')
+            with col_listed:
+                listed_filter = st.selectbox("Listed", list(yes_no), key='inventory_listed')
+            with col_graded:
+                graded_filter = st.selectbox("Graded", list(yes_no), key='inventory_graded')
+            with col_sold:
+                sold_filter = st.selectbox("Sold Status", ["All", "In Inventory", "Sold"], key='inventory_sold')
+            col_sort, col_direction = st.columns([3, 1])
+            with col_sort:
+                sort_by = st.selectbox("Sort By", ["Sheet Order"] + header, key='inventory_sort')
+            with col_direction:
+                sort_descending = st.checkbox("Descending", key='inventory_sort_descending')
+
+            filters = {}
+            if sport_filter != "All":
+                filters['Sport'] = sport_filter
+            if set_filter != "All":
+                filters['Set Name'] = set_filter
+            if yes_no[listed_filter] is not None:
+                filters['Listed_flag'] = yes_no[listed_filter]
+            if yes_no[graded_filter] is not None:
+                filters['Graded_flag'] = yes_no[graded_filter]
+            if sold_filter != "All":
+                filters['Sold'] = sold_filter == "Sold"
+
+            query_key = (tuple(sorted(filters.items())), sort_by, sort_descending)
+            if st.session_state.get('inventory_last_query') != query_key:
+                st.session_state.inventory_page = 0
+                st.session_state.inventory_last_query = query_key
+
+            col_prev, col_page_info, col_next = st.columns([1, 4, 1])
+            with col_prev:
+                if st.button("◀ Previous", key='inventory_prev'):
+                    st.session_state.inventory_page -= 1
+            with col_next:
+                if st.button("Next ▶", key='inventory_next'):
+                    st.session_state.inventory_page += 1
+
+            # --- Only the visible page is sent to the browser ---
+            query_args = dict(filters=filters, sort_by=None if sort_by == "Sheet Order" else sort_by,
+                              ascending=not sort_descending, page_size=INVENTORY_PAGE_SIZE)
+            page_number = max(st.session_state.inventory_page, 0)
+            with rerun_profile.stage("inventory query"):
+                page_cards, match_count = inventory_table.query(page=page_number, **query_args)
+                page_count = max(1, -(-match_count // INVENTORY_PAGE_SIZE))
+                if page_number >= page_count:
+                    page_number = page_count - 1
+                    page_cards, match_count = inventory_table.query(page=page_number, **query_args)
+            st.session_state.inventory_page = page_number
+            with col_page_info:
+                st.caption(f"{match_count} matching card(s) - page {page_number + 1} of {page_count}")
+
+            with rerun_profile.stage("render table"):
+                st.dataframe(page_cards, use_container_width=True, height=600)
+
+            st.markdown("#### Download All Cards")
+            render_export_buttons('all_cards', inventory_df, 'all_cards_inventory', columns=header)
+finally:
+    # Recorded even when the rerun ends early in st.rerun() or st.stop(), as every form submit does
+    perf_metrics = get_perf_metrics()
+    last_rerun = rerun_profile.finish(data_version=data_version, rows=len(records))
+    perf_metrics.record(last_rerun, client=get_sheets_client() if inventory_ws is not None else None,
+                        sync=get_inventory_sync() if inventory_ws is not None else None)
+
+# --- Performance debug panel (CARD_APP_DEBUG=1 or ?debug=1) ---
+if os.environ.get("CARD_APP_DEBUG") == "1" or st.query_params.get("debug") == "1":
+    render_perf_panel(last_rerun, perf_metrics)
@@ -0,0 +1,182 @@
+import bisect
+import re
+import threading
+from difflib import SequenceMatcher
+
+SEARCH_FIELDS = ['Player Name', 'Year', 'Set Name', 'Numbered', 'Lot Number']
+FUZZY_CUTOFF = 0.75
+FUZZY_CANDIDATES = 50
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Splits text into lowercase alphanumeric tokens ('Orange /249' -> ['orange', '249'])."""
+    return _TOKEN_PATTERN.findall(str(text).lower())
+
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def describe_card(record, row_number):
+    """Returns the label shown for a card in the Update tab picker."""
+    return (f"{record.get('Player Name', 'N/A')} - {record.get('Year', 'N/A')} - {record.get('Set Name', 'N/A')} - "
+            f"{record.get('Numbered', 'N/A')} - {record.get('Purchase Price', 'N/A')} (Row {row_number})")
+
+
+def _lot_number(record):
+    lot = record.get('Lot Number')
+    return int(lot) if isinstance(lot, (int, float)) and float(lot).is_integer() else None
+
+
+class CardSearchIndex:
+    """Inverted index over player, year, set, parallel and lot number, keyed by sheet row number.
+
+    Every query term must match some token of a card, by prefix first and,
+    when no token starts with a (non-numeric) term, by fuzzy (trigram +
+    similarity ratio) match to catch typos. Like InventoryRollups, the index describes one data
+    version and is patched through on_change() as an InventorySync listener.
+
+    Row numbers shift when rows are deleted, so anything kept across reruns
+    (like the Update tab's selection) should hold card_key() instead and map
+    it back with row_for_key() when it is used.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._tokens = {}      # row number -> tokens of that card
+        self._postings = {}    # token -> row numbers
+        self._vocabulary = []  # sorted tokens, for prefix lookups
+        self._trigram_index = {}
+        self._sorted_rows = None
+        self._lots = {}          # row number -> lot number
+        self._rows_by_lot = {}   # lot number -> row numbers
+
+    def ensure(self, records, data_version):
+        """Makes the index describe `data_version`, rebuilding from `records` only if patches can't get there."""
+        with self._lock:
+            if self.version != data_version:
+                self.rebuild(records)
+                self.version = data_version
+
+    def rebuild(self, records):
+        """Indexes every record from scratch (row numbers start at 2, below the header)."""
+        with self._lock:
+            self._reset()
+            for row_number, record in enumerate(records, start=2):
+                self._add(row_number, record, keep_sorted=False)
+            self._vocabulary = sorted(self._postings)
+
+    def on_change(self, changes, old_version, new_version):
+        """InventorySync listener: re-indexes changed rows."""
+        with self._lock:
+            if changes is None or self.version != old_version:
+                self.version = None
+                return
+            for row_number, _, new in changes:
+                self._remove(row_number)
+                if new is not None:
+                    self._add(row_number, new)
+            self.version = new_version
+
+    def search(self, query, page=0, page_size=25):
+        """Returns (row numbers on the requested page, total matches), newest rows first."""
+        with self._lock:
+            terms = tokenize(query)
+            if not terms:
+                if self._sorted_rows is None:
+                    self._sorted_rows = sorted(self._tokens, reverse=True)
+                matches = self._sorted_rows
+            else:
+                # Start from the rarest term so the intersection stays small
+                candidates = sorted((self._match_term(term) for term in terms), key=len)
+                rows = set(candidates[0])
+                for other in candidates[1:]:
+                    rows.intersection_update(other)
+                    if not rows:
+                        break
+                matches = sorted(rows, reverse=True)
+            start = page * page_size
+            return matches[start:start + page_size], len(matches)
+
+    def card_key(self, row_number):
+        """Stable key for the card in a row: ('lot', lot number), or ('row', row number) without a unique lot number."""
+        with self._lock:
+            lot = self._lots.get(row_number)
+            if lot is not None and len(self._rows_by_lot[lot]) == 1:
+                return ('lot', lot)
+            return ('row', row_number)
+
+    def row_for_key(self, key):
+        """Current row number of the card a card_key() points to, or None if it is no longer in the sheet."""
+        with self._lock:
+            kind, value = key
+            if kind == 'lot':
+                rows = self._rows_by_lot.get(value, ())
+                return next(iter(rows)) if len(rows) == 1 else None
+            return value if value in self._tokens else None
+
+    def _match_term(self, term):
+        rows = set()
+        position = bisect.bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            rows.update(self._postings[self._vocabulary[position]])
+            position += 1
+        # Numbers (years, lot numbers, print runs) are only matched exactly/by prefix
+        if rows or len(term) < 3 or term.isdigit():
+            return rows
+        for token in self._fuzzy_tokens(term):
+            rows.update(self._postings[token])
+        return rows
+
+    def _fuzzy_tokens(self, term):
+        shared = {}
+        for trigram in _trigrams(term):
+            for token in self._trigram_index.get(trigram, ()):
+                shared[token] = shared.get(token, 0) + 1
+        candidates = sorted(shared, key=shared.get, reverse=True)[:FUZZY_CANDIDATES]
+        return [token for token in candidates if SequenceMatcher(None, term, token).ratio() >= FUZZY_CUTOFF]
+
+    def _add(self, row_number, record, keep_sorted=True):
+        tokens = set(tokenize(" ".join(str(record.get(field, '')) for field in SEARCH_FIELDS)))
+        self._tokens[row_number] = tokens
+        lot = _lot_number(record)
+        if lot is not None:
+            self._lots[row_number] = lot
+            self._rows_by_lot.setdefault(lot, set()).add(row_number)
+        for token in tokens:
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = set()
+                if keep_sorted:
+                    bisect.insort(self._vocabulary, token)
+                if not token.isdigit():
+                    for trigram in _trigrams(token):
+                        self._trigram_index.setdefault(trigram, set()).add(token)
+            postings.add(row_number)
+        self._sorted_rows = None
+
+    def _remove(self, row_number):
+        tokens = self._tokens.pop(row_number, None)
+        if tokens is None:
+            return
+        lot = self._lots.pop(row_number, None)
+        if lot is not None:
+            self._rows_by_lot[lot].discard(row_number)
+            if not self._rows_by_lot[lot]:
+                del self._rows_by_lot[lot]
+        for token in tokens:
+            postings = self._postings[token]
+            postings.discard(row_number)
+            if not postings:
+                del self._postings[token]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, token)]
+                if not token.isdigit():
+                    for trigram in _trigrams(token):
+                        self._trigram_index[trigram].discard(token)
+        self._sorted_rows = None
@@ -0,0 +1,32 @@
+import io
+
+CSV_CHUNK_ROWS = 10_000
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def iter_csv_chunks(df, chunk_rows=CSV_CHUNK_ROWS):
+    """Yields the frame as UTF-8 CSV bytes, `chunk_rows` rows at a time (header in the first chunk)."""
+    if df.empty:
+        yield df.to_csv(index=False).encode('utf-8')
+        return
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+def write_parquet(df, chunk_rows=CSV_CHUNK_ROWS):
+    """Returns the frame as Parquet bytes, one row group per `chunk_rows` rows. Needs pyarrow."""
+    # Sheet columns can mix numbers and text (e.g. Year); Parquet needs one type per column
+    mixed = [column for column in df.columns if df[column].dtype == object]
+    buffer = io.BytesIO()
+    df.astype({column: str for column in mixed}).to_parquet(buffer, index=False, row_group_size=chunk_rows)
+    return buffer.getvalue()
+
+
+def export_inventory(df, file_format):
+    """Serializes the frame as 'CSV' or 'Parquet' bytes."""
+    if file_format == 'Parquet':
+        return write_parquet(df)
+    return b"".join(iter_csv_chunks(df))
@@ -0,0 +1,219 @@
+import itertools
+import json
+import random
+import threading
+import time
+
+import requests
+from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+
+def make_api_error(status_code, message="Injected error"):
+    """Builds a gspread APIError carrying the given HTTP status, as the real client raises it."""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps({"error": {"code": status_code, "message": message, "status": "FAKE"}}).encode()
+    return APIError(response)
+
+
+class FakeWorksheet:
+    """In-memory stand-in for a gspread Worksheet that can inject latency and errors.
+
+    Holds the sheet as a list of rows of strings (row 1 is the header) and
+    implements the Worksheet methods this app calls. Each call sleeps for
+    `latency` seconds (or a uniform draw from a (min, max) tuple) and fails with
+    a random status from `error_statuses` with probability `error_rate`.
+    fail_next() queues specific errors for the next calls, and lose_next()
+    makes the next writes fail with a 503 after they were applied, like a
+    response lost on the way back. `calls` counts calls per method.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, values=None, title="Inventory", latency=0.0, error_rate=0.0, error_statuses=(429, 503)):
+        self.id = next(self._ids)
+        self.title = title
+        self.spreadsheet = None
+        self.values = [[str(v) for v in row] for row in (values or [])]
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.calls = {}
+        self._queued_errors = []
+        self._lost_responses = 0
+        self._lock = threading.Lock()
+
+    def fail_next(self, status_code, times=1):
+        """Makes the next `times` calls fail with `status_code`."""
+        with self._lock:
+            self._queued_errors.extend([status_code] * times)
+
+    def lose_next(self, times=1):
+        """Makes the next `times` append_rows/batch_update calls apply their write, then fail with a 503."""
+        with self._lock:
+            self._lost_responses += times
+
+    def _respond(self, response):
+        with self._lock:
+            lost = self._lost_responses > 0
+            self._lost_responses -= lost
+        if lost:
+            raise make_api_error(503)
+        return response
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            status = self._queued_errors.pop(0) if self._queued_errors else None
+        latency = random.uniform(*self.latency) if isinstance(self.latency, tuple) else self.latency
+        if latency:
+            time.sleep(latency)
+        if status is None and self.error_rate and random.random() < self.error_rate:
+            status = random.choice(self.error_statuses)
+        if status is not None:
+            raise make_api_error(status)
+
+    def _range_values(self, name):
+        grid = a1_range_to_grid_range(name.split("!")[-1])
+        start_row = grid.get("startRowIndex", 0)
+        end_row = grid.get("endRowIndex", len(self.values))
+        start_col = grid.get("startColumnIndex", 0)
+        end_col = grid.get("endColumnIndex")
+        rows = [row[start_col:end_col] for row in self.values[start_row:end_row]]
+        # Like the API, trailing empty cells and rows are left out
+        rows = [row[:max((i + 1 for i, v in enumerate(row) if v != ""), default=0)] for row in rows]
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    # --- Reads ---
+    def get_all_values(self):
+        self._call("get_all_values")
+        with self._lock:
+            return self._range_values("A1:ZZ")
+
+    def batch_get(self, ranges):
+        self._call("batch_get")
+        with self._lock:
+            return [self._range_values(name) for name in ranges]
+
+    def row_values(self, row):
+        self._call("row_values")
+        with self._lock:
+            values = self._range_values(f"A{row}:ZZ{row}")
+            return values[0] if values else []
+
+    def get_all_records(self):
+        self._call("get_all_records")
+        with self._lock:
+            values = self._range_values("A1:ZZ")
+        if not values:
+            return []
+        header = values[0]
+        return [dict(zip(header, row + [""] * (len(header) - len(row)))) for row in values[1:]]
+
+    # --- Writes ---
+    def append_rows(self, rows, **kwargs):
+        self._call("append_rows")
+        with self._lock:
+            start = len(self.values) + 1
+            self.values.extend([str(v) for v in row] for row in rows)
+            end = len(self.values)
+            width = max((len(row) for row in rows), default=1)
+        updated_range = f"{self.title}!A{start}:{rowcol_to_a1(end, width)}"
+        return self._respond({"updates": {"updatedRange": updated_range, "updatedRows": len(rows)}})
+
+    def append_row(self, row, **kwargs):
+        return self.append_rows([row], **kwargs)
+
+    def batch_update(self, data, **kwargs):
+        self._call("batch_update")
+        with self._lock:
+            for update in data:
+                grid = a1_range_to_grid_range(update["range"].split("!")[-1])
+                for r, row in enumerate(update["values"]):
+                    for c, value in enumerate(row):
+                        self._set(grid["startRowIndex"] + r, grid["startColumnIndex"] + c, value)
+        return self._respond({"totalUpdatedCells": sum(len(row) for update in data for row in update["values"])})
+
+    def update_cells(self, cell_list, **kwargs):
+        self._call("update_cells")
+        with self._lock:
+            for cell in cell_list:
+                self._set(cell.row - 1, cell.col - 1, cell.value)
+
+    def delete_rows(self, start_index, end_index=None):
+        self._call("delete_rows")
+        with self._lock:
+            del self.values[start_index - 1:(end_index or start_index)]
+
+    def _delete_dimension(self, request):
+        with self._lock:
+            del self.values[request["startIndex"]:request["endIndex"]]
+
+    def _set(self, row_index, col_index, value):
+        while len(self.values) <= row_index:
+            self.values.append([])
+        row = self.values[row_index]
+        if len(row) <= col_index:
+            row.extend([""] * (col_index + 1 - len(row)))
+        row[col_index] = str(value)
+
+
+class FakeSpreadsheet:
+    """In-memory stand-in for a gspread Spreadsheet holding FakeWorksheets.
+
+    Worksheets created with add_worksheet() get the spreadsheet's `latency`.
+    batch_update() supports the deleteDimension requests the app sends.
+    fail_next() queues errors for the next worksheets() or add_worksheet()
+    calls, which are counted in `calls`.
+    """
+
+    def __init__(self, worksheets=(), latency=0.0):
+        self.latency = latency
+        self.calls = {}
+        self._queued_errors = []
+        self._worksheets = []
+        for worksheet in worksheets:
+            self._attach(worksheet)
+
+    def fail_next(self, status_code, times=1):
+        """Makes the next `times` worksheets()/add_worksheet() calls fail with `status_code`."""
+        self._queued_errors.extend([status_code] * times)
+
+    def _call(self, method):
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self._queued_errors:
+            raise make_api_error(self._queued_errors.pop(0))
+
+    def _attach(self, worksheet):
+        worksheet.spreadsheet = self
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def worksheets(self):
+        self._call("worksheets")
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        self._call("add_worksheet")
+        return self._attach(FakeWorksheet(title=title, latency=self.latency))
+
+    def batch_update(self, body):
+        worksheets = {worksheet.id: worksheet for worksheet in self._worksheets}
+        requests = [request["deleteDimension"]["range"] for request in body["requests"]]
+        if requests:
+            worksheets[requests[0]["sheetId"]]._call("spreadsheet_batch_update")
+        # Requests apply in order, as in the API
+        for request in requests:
+            worksheets[request["sheetId"]]._delete_dimension(request)
+        return {"replies": [{} for _ in requests]}
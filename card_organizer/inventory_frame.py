@@ -0,0 +1,97 @@
+import pandas as pd
+
+from card_definitions import SPORT_BY_SET
+
+# Sheet column -> typed column added next to it
+MONEY_COLUMNS = {
+    'Purchase Price': 'Purchase Price_num',
+    'Sold Price': 'Sold Price_num',
+    'Takeaway': 'Takeaway_num',
+}
+DATE_COLUMNS = {
+    'Date Purchased': 'Purchase Date_dt',
+    'Sold Date': 'Sold Date_dt',
+}
+FLAG_COLUMNS = {
+    'Auto': 'Auto_flag',
+    'Patch': 'Patch_flag',
+    'Graded': 'Graded_flag',
+    'Listed': 'Listed_flag',
+}
+LOT_COLUMN = 'Lot Number'
+LOT_NUMBER_COLUMN = 'Lot Number_num'
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORY_COLUMNS = ['Set Name', 'Numbered', 'Seller Name', 'Website']
+
+
+def safe_float_conversion(money_str):
+    """Safely converts a string with a dollar sign to a float."""
+    if isinstance(money_str, (int, float)):
+        return float(money_str)
+    if isinstance(money_str, str):
+        cleaned_str = money_str.replace('$', '').replace(',', '')
+        try:
+            return float(cleaned_str)
+        except ValueError:
+            return 0.0
+    return 0.0
+
+
+def parse_money(series):
+    """Vectorized safe_float_conversion: strips '$' and ',' and maps anything unparseable to 0.0."""
+    cleaned = series.astype(str).str.replace(r'[$,]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').fillna(0.0).astype('float64')
+
+
+def parse_money_value(value):
+    """parse_money() for a single cell, so a patched record gets the same amount as a rebuilt column."""
+    return float(parse_money(pd.Series([value], dtype=object)).iloc[0])
+
+
+def parse_dates(series):
+    """Parses sheet date cells to datetimes (NaT for blank or invalid ones), each cell on its own.
+
+    pd.to_datetime infers one format from the first cell of a column, so on a
+    sheet with mixed formats a cell's date would depend on what else is in
+    the column. Here ISO dates (what the app writes) are parsed vectorized
+    and any other cell falls back to being parsed by itself, so a cell
+    always gets the same date, whether a whole column or a single changed
+    record is parsed.
+    """
+    text = series.astype(str).str.strip()
+    parsed = pd.to_datetime(text, format='ISO8601', errors='coerce')
+    rest = parsed.isna() & ~text.isin(['', 'None', 'nan', 'NaT'])
+    if rest.any():
+        parsed[rest] = pd.to_datetime(text[rest], format='mixed', errors='coerce')
+    return parsed
+
+
+def build_typed_inventory(records, header):
+    """Builds the typed inventory frame every tab reads from.
+
+    The sheet columns are kept (with CATEGORY_COLUMNS as categoricals) and the
+    parsed money, date, Yes/No flag and lot number columns are added next to
+    them, together with 'Sport' (derived from the set name) and
+    'Profit_Per_Item' for sold cards.
+    """
+    df = pd.DataFrame(records, columns=header or None)
+
+    for column, typed_column in MONEY_COLUMNS.items():
+        df[typed_column] = parse_money(df[column]) if column in df else 0.0
+    for column, typed_column in DATE_COLUMNS.items():
+        df[typed_column] = parse_dates(df[column]) if column in df else pd.NaT
+    for column, typed_column in FLAG_COLUMNS.items():
+        df[typed_column] = df[column].astype(str).eq('Yes') if column in df else False
+    if LOT_COLUMN in df:
+        lots = pd.to_numeric(df[LOT_COLUMN], errors='coerce')
+        df[LOT_NUMBER_COLUMN] = lots.where(lots % 1 == 0).astype('Int64')
+    else:
+        df[LOT_NUMBER_COLUMN] = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype(str).astype('category')
+    sport = df['Set Name'].astype(str).map(SPORT_BY_SET) if 'Set Name' in df else pd.Series(index=df.index, dtype=object)
+    df['Sport'] = sport.fillna('Other').astype('category')
+
+    df['Profit_Per_Item'] = (df['Takeaway_num'] - df['Purchase Price_num']).where(df['Sold Date_dt'].notna(), 0.0)
+    return df
@@ -0,0 +1,62 @@
+import numpy as np
+
+from inventory_frame import DATE_COLUMNS, LOT_COLUMN, LOT_NUMBER_COLUMN, MONEY_COLUMNS
+
+# Sheet columns that sort by their parsed value instead of their text
+SORT_KEYS = {**MONEY_COLUMNS, **DATE_COLUMNS, LOT_COLUMN: LOT_NUMBER_COLUMN}
+
+
+class InventoryTable:
+    """Filter/sort/page queries over one version of the typed inventory frame.
+
+    Filter masks and sort orders are computed on first use and kept, so
+    flipping through pages or re-applying a filter only slices arrays; only
+    the rows of the requested page are materialized.
+    """
+
+    def __init__(self, df, columns):
+        self.df = df.reset_index(drop=True)
+        self.columns = [column for column in columns if column in self.df]
+        self._masks = {}
+        self._orders = {}
+
+    def mask(self, column, value):
+        """Boolean array of rows where `column` equals `value`."""
+        key = (column, value)
+        if key not in self._masks:
+            if column == 'Sold':
+                mask = self.df['Sold Date_dt'].notna().to_numpy()
+                self._masks[key] = mask if value else ~mask
+            else:
+                self._masks[key] = (self.df[column] == value).to_numpy()
+        return self._masks[key]
+
+    def order(self, column, ascending=True):
+        """Row positions sorted by `column` (blanks last)."""
+        key = (column, ascending)
+        if key not in self._orders:
+            values = self.df[SORT_KEYS.get(column, column)]
+            try:
+                ordered = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+            except TypeError:
+                # Mixed numbers and text (e.g. a hand-typed Year); sort as text
+                ordered = values.astype(str).sort_values(ascending=ascending, kind='stable')
+            self._orders[key] = ordered.index.to_numpy()
+        return self._orders[key]
+
+    def query(self, filters=None, sort_by=None, ascending=True, page=0, page_size=50):
+        """Returns (page of rows, total matching rows) for {column: value} filters.
+
+        Flag columns ('Listed_flag', 'Graded_flag') take booleans and the
+        pseudo-column 'Sold' filters on whether a card has a sold date.
+        """
+        selected = np.ones(len(self.df), dtype=bool)
+        for column, value in (filters or {}).items():
+            selected &= self.mask(column, value)
+        if sort_by:
+            positions = self.order(sort_by, ascending)
+            positions = positions[selected[positions]]
+        else:
+            positions = np.flatnonzero(selected)
+        start = page * page_size
+        return self.df.iloc[positions[start:start + page_size]][self.columns], len(positions)
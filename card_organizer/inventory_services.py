@@ -0,0 +1,44 @@
+from card_archive import CardArchive
+from card_search import CardSearchIndex
+from lot_allocator import LotNumberAllocator
+from rollups import InventoryRollups
+from sheet_sync import InventorySync
+from sheets_client import SheetsClient
+from write_queue import WriteQueue
+
+POLL_INTERVAL = 60
+FULL_SYNC_INTERVAL = 15 * 60
+WRITE_BATCH_SIZE = 50
+UPDATE_PICKER_PAGE_SIZE = 50
+INVENTORY_PAGE_SIZE = 100
+
+
+class InventoryServices:
+    """The process-wide objects behind the app, wired to the Inventory worksheet.
+
+    card_inventory_app.py keeps one per process (st.cache_resource) and hands
+    out its parts through its get_* functions; benchmark.py and the tests
+    build their own over a fake_worksheet.FakeWorksheet, so they all run the
+    same wiring. Every sheet call goes through `client`, and the rollups, lot
+    allocator and search index are patched by `sync` as listeners.
+    `client_options` are passed to SheetsClient (e.g. quotas for a fake
+    worksheet, which has none).
+    """
+
+    def __init__(self, worksheet, snapshot_path=None, archive_path=None, **client_options):
+        self.worksheet = worksheet
+        self.client = SheetsClient(worksheet, **client_options)
+        self.sync = InventorySync(self.client, poll_interval=POLL_INTERVAL, full_sync_interval=FULL_SYNC_INTERVAL,
+                                  snapshot_path=snapshot_path)
+        self.write_queue = WriteQueue(self.client, self.sync, batch_size=WRITE_BATCH_SIZE)
+        self.archive = CardArchive(self.client, path=archive_path)
+        self.rollups = InventoryRollups()
+        self.lot_allocator = LotNumberAllocator()
+        self.search_index = CardSearchIndex()
+        for listener in (self.rollups, self.lot_allocator, self.search_index):
+            self.sync.add_listener(listener.on_change)
+
+    def load_archive(self):
+        """Loads the archive and reserves its lot numbers, since archived cards keep them."""
+        self.archive.load()
+        self.lot_allocator.reserve(self.archive.lot_numbers())
@@ -0,0 +1,94 @@
+import threading
+
+from inventory_frame import LOT_COLUMN, LOT_NUMBER_COLUMN
+
+
+def _lot_number(value):
+    """Returns a record's lot number as an int, or None if it isn't a whole number."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(number) if number.is_integer() else None
+
+
+class LotNumberAllocator:
+    """Hands out lot numbers atomically to every session of this process.
+
+    Keeps the high-water mark and the set of lot numbers in use. allocate()
+    issues fresh numbers (single or a consecutive block) and claim() reserves a
+    number the user typed in; both are O(1) under a lock, so two sessions can
+    never get the same number. Numbers are only ever added: the allocator is
+    checked against the sheet through ensure() (after a full resync) and
+    on_change() (as an InventorySync listener), the same way as the rollups.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.high_water = 0
+        self._used = set()
+        self._lock = threading.Lock()
+
+    def ensure(self, df, data_version):
+        """Takes in every lot number of the typed inventory frame if this version hasn't been seen."""
+        with self._lock:
+            if self.version == data_version:
+                return
+            lots = df[LOT_NUMBER_COLUMN].dropna()
+            if not lots.empty:
+                self._used.update(int(lot) for lot in lots.unique())
+                self.high_water = max(self.high_water, int(lots.max()))
+            self.version = data_version
+
+    def on_change(self, changes, old_version, new_version):
+        """InventorySync listener: takes in the lot numbers of changed rows."""
+        with self._lock:
+            if changes is None or self.version != old_version:
+                self.version = None
+                return
+            for _, _, new in changes:
+                lot = _lot_number(new.get(LOT_COLUMN)) if new is not None else None
+                if lot is not None:
+                    self._used.add(lot)
+                    self.high_water = max(self.high_water, lot)
+            self.version = new_version
+
+    def reserve(self, lot_numbers):
+        """Marks lot numbers that are in use outside the Inventory worksheet (archived cards) as taken."""
+        with self._lock:
+            lot_numbers = set(lot_numbers)
+            self._used.update(lot_numbers)
+            self.high_water = max(self.high_water, max(lot_numbers, default=0))
+
+    def peek(self):
+        """The number allocate() would hand out next (not reserved)."""
+        return self.high_water + 1
+
+    def allocate(self, count=1):
+        """Reserves `count` consecutive fresh lot numbers and returns the first one."""
+        with self._lock:
+            first = self.high_water + 1
+            self.high_water += count
+            self._used.update(range(first, first + count))
+            return first
+
+    def claim(self, lot_number):
+        """Reserves a specific lot number. Returns False if it is already in use."""
+        with self._lock:
+            if lot_number in self._used:
+                return False
+            self._used.add(lot_number)
+            self.high_water = max(self.high_water, lot_number)
+            return True
+
+    def release(self, lot_numbers):
+        """Frees numbers from allocate()/claim() that never reached the sheet, e.g. after a failed import.
+
+        The high-water mark stays where it is, so allocate() doesn't hand them
+        out again, but they can be claimed.
+        """
+        with self._lock:
+            self._used.difference_update(lot_numbers)
+
+    def is_used(self, lot_number):
+        return lot_number in self._used
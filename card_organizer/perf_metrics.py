@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("card_inventory.perf")
+
+# Seconds between rewrites of the Prometheus textfile
+METRICS_FILE_INTERVAL = 15
+
+_current = threading.local()
+
+
+def note_cache_miss(name):
+    """Marks cache `name` as missed in this rerun. Call it inside a cached function, whose body only runs on a miss."""
+    profile = getattr(_current, "profile", None)
+    if profile is not None:
+        profile.cache_misses.add(name)
+
+
+class RerunProfile:
+    """Timings of one script rerun, split into named stages.
+
+    Wrap each hot-path step in `with profile.stage(name):`. Passing the name
+    of a version-keyed cache as `cache` records whether the step was served
+    from the cache (see note_cache_miss).
+    """
+
+    def __init__(self, client=None):
+        self.client = client
+        self.stages = {}
+        self.cache_results = {}
+        self.cache_misses = set()
+        self.tab = None
+        self._start = time.perf_counter()
+        self._api_before = self._api_counts()
+        _current.profile = self
+
+    @contextmanager
+    def stage(self, name, cache=None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+            if cache is not None:
+                self.cache_results[cache] = "miss" if cache in self.cache_misses else "hit"
+
+    def _api_counts(self):
+        if self.client is None:
+            return {}
+        stats = self.client.stats
+        return {key: stats[key] for key in ("reads", "writes", "retries", "throttled_seconds", "api_seconds")}
+
+    def finish(self, **fields):
+        """Ends the rerun and returns it as a plain dict (extra `fields` are included as is)."""
+        if getattr(_current, "profile", None) is self:
+            _current.profile = None
+        api_after = self._api_counts()
+        # Process-wide counters, so concurrent sessions' calls land in whichever rerun is running
+        api = {key: api_after[key] - self._api_before[key] for key in api_after}
+        return {
+            "timestamp": time.time(),
+            "tab": self.tab,
+            "total_seconds": time.perf_counter() - self._start,
+            "stages": self.stages,
+            "cache": self.cache_results,
+            "api": api,
+            **fields,
+        }
+
+
+class PerfMetrics:
+    """Process-wide aggregates of rerun profiles, exported as logs and a Prometheus textfile.
+
+    Every finished rerun is logged as one JSON line on the
+    "card_inventory.perf" logger (to `log_path` if given). With
+    `metrics_path`, counters for reruns, stage timings, cache hits and
+    Sheets API use are written there in the Prometheus text format, at most
+    every METRICS_FILE_INTERVAL seconds, for node_exporter's textfile collector.
+    """
+
+    def __init__(self, log_path=None, metrics_path=None):
+        self.metrics_path = metrics_path
+        self.reruns = {}
+        self.stage_totals = {}
+        self.cache_totals = {}
+        self.recent = []
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        if log_path:
+            handler = logging.FileHandler(log_path)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+    def record(self, profile, client=None, sync=None, max_recent=20):
+        """Adds a finished rerun (RerunProfile.finish()) to the totals, logs it and refreshes the metrics file."""
+        with self._lock:
+            tab = profile["tab"] or "none"
+            self.reruns[tab] = self.reruns.get(tab, 0) + 1
+            for name, seconds in [("total", profile["total_seconds"]), *profile["stages"].items()]:
+                totals = self.stage_totals.setdefault(name, {"count": 0, "seconds": 0.0, "max": 0.0})
+                totals["count"] += 1
+                totals["seconds"] += seconds
+                totals["max"] = max(totals["max"], seconds)
+            for name, result in profile["cache"].items():
+                totals = self.cache_totals.setdefault(name, {"hit": 0, "miss": 0})
+                totals[result] += 1
+            self.recent = (self.recent + [profile])[-max_recent:]
+            due = self.metrics_path and time.monotonic() - self._last_write >= METRICS_FILE_INTERVAL
+            if due:
+                self._last_write = time.monotonic()
+        logger.info(json.dumps(profile, default=str))
+        if due:
+            try:
+                self.write_metrics_file(client, sync)
+            except OSError as e:
+                logger.warning("Could not write metrics file %s: %s", self.metrics_path, e)
+
+    def prometheus_text(self, client=None, sync=None):
+        """Returns the current metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP card_app_{name} {help_text}")
+            lines.append(f"# TYPE card_app_{name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels.items())
+                lines.append(f"card_app_{name}{{{label_text}}} {value}" if label_text else f"card_app_{name} {value}")
+
+        with self._lock:
+            metric("reruns_total", "counter", "Script reruns per tab.",
+                   [({"tab": tab}, count) for tab, count in sorted(self.reruns.items())])
+            metric("stage_seconds_total", "counter", "Seconds spent per rerun stage.",
+                   [({"stage": name}, totals["seconds"]) for name, totals in sorted(self.stage_totals.items())])
+            metric("stage_runs_total", "counter", "Reruns that went through each stage.",
+                   [({"stage": name}, totals["count"]) for name, totals in sorted(self.stage_totals.items())])
+            metric("stage_max_seconds", "gauge", "Slowest run of each stage.",
+                   [({"stage": name}, totals["max"]) for name, totals in sorted(self.stage_totals.items())])
+            metric("cache_requests_total", "counter", "Version-keyed cache lookups by result.",
+                   [({"cache": name, "result": result}, count)
+                    for name, totals in sorted(self.cache_totals.items()) for result, count in totals.items()])
+        if client is not None:
+            stats = dict(client.stats)
+            methods = client.method_stats_copy()
+            metric("sheets_requests_total", "counter", "Sheets API requests by Worksheet method.",
+                   [({"method": method}, values["calls"]) for method, values in sorted(methods.items())])
+            metric("sheets_errors_total", "counter", "Failed Sheets API requests by Worksheet method.",
+                   [({"method": method}, values["errors"]) for method, values in sorted(methods.items())])
+            metric("sheets_request_seconds_total", "counter", "Seconds spent in Sheets API requests.",
+                   [({"method": method}, values["seconds"]) for method, values in sorted(methods.items())])
+            metric("sheets_retries_total", "counter", "Sheets API requests retried.", [({}, stats["retries"])])
+            metric("sheets_coalesced_reads_total", "counter", "Reads served by an identical in-flight read.",
+                   [({}, stats["coalesced"])])
+            metric("sheets_throttled_seconds_total", "counter", "Seconds waited for quota tokens.",
+                   [({}, stats["throttled_seconds"])])
+            quota = client.quota_usage()
+            metric("sheets_quota_used", "gauge", "Requests made in the last minute.",
+                   [({"kind": kind}, used) for kind, (used, _) in quota.items()])
+            metric("sheets_quota_limit", "gauge", "Requests allowed per minute.",
+                   [({"kind": kind}, limit) for kind, (_, limit) in quota.items()])
+        if sync is not None:
+            stats = dict(sync.stats)
+            metric("syncs_total", "counter", "Sheet syncs by kind.",
+                   [({"kind": "full"}, stats["full_syncs"]), ({"kind": "incremental"}, stats["incremental_syncs"])])
+            metric("sync_seconds_total", "counter", "Seconds spent syncing by kind.",
+                   [({"kind": "full"}, stats["full_sync_seconds"]),
+                    ({"kind": "incremental"}, stats["incremental_sync_seconds"])])
+            metric("inventory_rows", "gauge", "Rows in the local inventory copy.", [({}, len(sync.records))])
+            metric("data_version", "gauge", "Current inventory data version.", [({}, sync.version)])
+        return "\n".join(lines) + "\n"
+
+    def write_metrics_file(self, client=None, sync=None):
+        """Writes prometheus_text() to `metrics_path` atomically."""
+        directory = os.path.dirname(os.path.abspath(self.metrics_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text(client, sync))
+            os.replace(tmp_path, self.metrics_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
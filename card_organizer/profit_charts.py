@@ -0,0 +1,128 @@
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+DAILY_WINDOW_DAYS = 60
+MONTHLY_WINDOW_DAYS = 2 * 365
+# Longest series sent to the browser; longer ones are downsampled
+MAX_LINE_POINTS = 500
+MAX_BARS = 400
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the shape of (x, y).
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bucket_size = (n - 2) / (threshold - 2)
+    indices = np.empty(threshold, dtype=int)
+    indices[0] = kept = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[kept] - avg_x) * (y[start:end] - y[kept])
+                       - (x[kept] - x[start:end]) * (avg_y - y[kept]))
+        kept = start + int(areas.argmax())
+        indices[i + 1] = kept
+    indices[-1] = n - 1
+    return indices
+
+
+def downsample_line(df, x_column, y_column, max_points=MAX_LINE_POINTS):
+    """Keeps at most `max_points` rows of a time series, chosen with LTTB."""
+    if len(df) <= max_points:
+        return df
+    x = pd.to_datetime(df[x_column]).astype('int64').to_numpy()
+    return df.iloc[lttb_indices(x, df[y_column].to_numpy(), max_points)]
+
+
+def inventory_status_figure(in_inventory, sold):
+    """Pie chart of cards in inventory vs. sold."""
+    status_data = pd.DataFrame({'Status': ['In Inventory', 'Sold'], 'Count': [in_inventory, sold]})
+    fig = px.pie(status_data, values='Count', names='Status',
+                 title='Inventory vs. Sold', hole=0.3, template='plotly_white',
+                 hover_data={'Count': False, 'Status': False})
+    fig.update_traces(hovertemplate='Status: %{label}<br>Count: %{value}<extra></extra>')
+    fig.update_traces(textinfo='percent+label', textposition='outside',
+                      texttemplate='%{label}<br>%{percent}')
+    fig.update_layout(uniformtext_minsize=10, uniformtext_mode='hide')
+    return fig
+
+
+def daily_spending_figure(daily_spending, zoomed_out=False):
+    """Bar chart of the last 60 days of spending, or of all of it (weekly bars if too many days)."""
+    if daily_spending.empty:
+        return None
+    max_date = daily_spending['Purchase Day'].max()
+    title = 'Total Spending Per Day'
+    if zoomed_out:
+        if len(daily_spending) > MAX_BARS:
+            days = pd.to_datetime(daily_spending['Purchase Day'])
+            daily_spending = (daily_spending.groupby(days.dt.to_period('W').dt.start_time)['Purchase Price_num']
+                              .sum().rename_axis('Purchase Day').reset_index())
+            title = 'Total Spending Per Week'
+    else:
+        daily_spending = daily_spending[daily_spending['Purchase Day'] >= max_date - timedelta(days=DAILY_WINDOW_DAYS)]
+    fig = px.bar(daily_spending, x='Purchase Day', y='Purchase Price_num',
+                 title=title, template='plotly_white',
+                 hover_data={'Purchase Day': False, 'Purchase Price_num': False})
+    fig.update_traces(hovertemplate='Date: %{x}<br>Total Spent: $%{y:.2f}<extra></extra>')
+    fig.update_layout(hovermode="x unified")
+    if not zoomed_out:
+        fig.update_xaxes(range=[max_date - timedelta(days=DAILY_WINDOW_DAYS), max_date])
+    return fig
+
+
+def monthly_spending_figure(monthly_spending, zoomed_out=False):
+    """Bar chart of the last two years of monthly spending, or of all of it."""
+    if monthly_spending.empty:
+        return None
+    monthly_dates = pd.to_datetime(monthly_spending['Purchase Month'], format='%b %Y')
+    max_month_date = monthly_dates.max()
+    min_month_date_2_years_ago = max_month_date - timedelta(days=MONTHLY_WINDOW_DAYS)
+    if not zoomed_out:
+        monthly_spending = monthly_spending[monthly_dates >= min_month_date_2_years_ago]
+    fig = px.bar(monthly_spending, x='Purchase Month', y='Purchase Price_num',
+                 title='Total Spending Per Month', template='plotly_white',
+                 hover_data={'Purchase Month': False})
+    fig.update_traces(hovertemplate='Month: %{x}<br>Total Spent: $%{y:.2f}<extra></extra>')
+    fig.update_layout(hovermode="x unified")
+    if not zoomed_out:
+        fig.update_xaxes(range=[min_month_date_2_years_ago, max_month_date])
+    return fig
+
+
+def cumulative_profit_figure(daily_profit_sum):
+    """Line chart of cumulative profit, downsampled with LTTB for long sales histories."""
+    if daily_profit_sum.empty:
+        return None
+    daily_profit_sum = downsample_line(daily_profit_sum, 'Sold Date_dt', 'Cumulative Profit')
+    fig = px.line(daily_profit_sum, x='Sold Date_dt', y='Cumulative Profit',
+                  title='Cumulative Profit Trend Over Time', template='plotly_white', markers=True,
+                  hover_data={'Sold Date_dt': False})
+    fig.update_traces(hovertemplate='Date: %{x|%b %d, %Y}<br>Cumulative Profit: $%{y:.2f}<extra></extra>')
+    fig.update_layout(hovermode="x unified", hoverlabel_namelength=-1)
+    return fig
+
+
+def build_profit_figures(rollups, zoomed_out=False):
+    """Builds the Profit Tracker figures from the rollups as plain dicts (None for charts without data)."""
+    figures = {
+        'status': inventory_status_figure(rollups.card_count - rollups.sold_count, rollups.sold_count),
+        'daily': daily_spending_figure(rollups.daily_spending_frame(), zoomed_out),
+        'monthly': monthly_spending_figure(rollups.monthly_spending_frame(), zoomed_out),
+        'profit': cumulative_profit_figure(rollups.cumulative_profit_frame()),
+    }
+    return {name: None if fig is None else fig.to_dict() for name, fig in figures.items()}
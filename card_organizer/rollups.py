@@ -0,0 +1,293 @@
+import bisect
+import threading
+from itertools import accumulate
+
+import pandas as pd
+
+from card_definitions import sport_for_set
+from inventory_frame import parse_dates, parse_money_value
+
+# Group name -> sheet column the totals are grouped by ('Sport' is derived from 'Set Name')
+GROUP_COLUMNS = {'Sport': 'Set Name', 'Set': 'Set Name', 'Seller': 'Seller Name'}
+
+
+def _parse_day(value):
+    """Parses a sheet date cell to a datetime.date, or None if it is blank or invalid.
+
+    Goes through parse_dates() like rebuild(), so patched and rebuilt rollups agree.
+    """
+    if value in ("", None):
+        return None
+    parsed = parse_dates(pd.Series([value], dtype=object)).iloc[0]
+    return None if pd.isna(parsed) else parsed.date()
+
+
+class _SortedTotals:
+    """Amounts per sortable key (day or month) with the keys kept in order."""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+        self.keys = []
+        self._running = []
+        self._running_valid = 0
+
+    def add(self, key, amount, sign=1):
+        """Adds (sign=1) or removes (sign=-1) one item's amount under `key`. O(log n) plus list insertion."""
+        if key not in self.totals:
+            if sign < 0:
+                return
+            self.totals[key] = 0.0
+            self.counts[key] = 0
+            position = bisect.bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+        else:
+            position = bisect.bisect_left(self.keys, key)
+        self.totals[key] += sign * amount
+        self.counts[key] += sign
+        if self.counts[key] <= 0:
+            del self.totals[key], self.counts[key]
+            del self.keys[position]
+        # Running totals before `position` are unaffected and stay cached
+        self._running_valid = min(self._running_valid, position)
+
+    def running(self):
+        """Returns the running total per key, only recomputing past the earliest patched key."""
+        start = self._running_valid
+        del self._running[start:]
+        base = self._running[-1] if self._running else 0.0
+        self._running.extend(accumulate((self.totals[key] for key in self.keys[start:]), initial=base))
+        del self._running[start]
+        self._running_valid = len(self.keys)
+        return self._running
+
+
+class InventoryRollups:
+    """Profit Tracker aggregates maintained incrementally instead of recomputed on every rerun.
+
+    The rollups describe one data version of the inventory. rebuild() computes
+    them from the typed inventory frame with vectorized groupbys; after that,
+    on_change() (registered as an InventorySync listener) patches them per
+    added, edited or removed record. When a change can't be applied (a full
+    resync, or a version the rollups never saw) they are rebuilt on the next
+    ensure() call.
+    """
+
+    def __init__(self):
+        self.version = None
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self.total_spent = 0.0
+        self.total_sold = 0.0
+        self.total_profit = 0.0
+        self.card_count = 0
+        self.sold_count = 0
+        self.daily_spend = _SortedTotals()
+        self.monthly_spend = _SortedTotals()
+        self.daily_profit = _SortedTotals()
+        # group name -> key -> [spent, sold, profit, cards]
+        self.groups = {name: {} for name in GROUP_COLUMNS}
+
+    def ensure(self, df, data_version):
+        """Makes the rollups describe `data_version`, rebuilding from `df` only if patches can't get there."""
+        with self._lock:
+            if self.version != data_version:
+                self.rebuild(df)
+                self.version = data_version
+
+    def rebuild(self, df):
+        """Recomputes every aggregate from the typed inventory frame."""
+        with self._lock:
+            self._reset()
+            self.total_spent = float(df['Purchase Price_num'].sum())
+            self.total_sold = float(df['Sold Price_num'].sum())
+            self.total_profit = float(df['Profit_Per_Item'].sum())
+            self.card_count = len(df)
+            self.sold_count = int(df['Sold Date_dt'].notna().sum())
+
+            purchased = df.dropna(subset=['Purchase Date_dt'])
+            purchase_days = purchased['Purchase Date_dt'].dt.date
+            self._load(self.daily_spend, purchased['Purchase Price_num'].groupby(purchase_days).agg(['sum', 'count']))
+            purchase_months = [purchased['Purchase Date_dt'].dt.year, purchased['Purchase Date_dt'].dt.month]
+            self._load(self.monthly_spend, purchased['Purchase Price_num'].groupby(purchase_months).agg(['sum', 'count']))
+            sold = df.dropna(subset=['Sold Date_dt'])
+            self._load(self.daily_profit, sold['Profit_Per_Item'].groupby(sold['Sold Date_dt'].dt.date).agg(['sum', 'count']))
+
+            for name, column in GROUP_COLUMNS.items():
+                if name == 'Sport':
+                    keys = df['Sport'].astype(str)
+                elif column in df:
+                    keys = df[column].astype(str)
+                else:
+                    continue
+                grouped = df[['Purchase Price_num', 'Sold Price_num', 'Profit_Per_Item']].groupby(keys, observed=True)
+                totals = grouped.sum().join(grouped.size().rename('Cards'))
+                self.groups[name] = {key: [float(spent), float(sold_price), float(profit), int(cards)]
+                                     for key, (spent, sold_price, profit, cards) in totals.iterrows()}
+
+    @staticmethod
+    def _load(sorted_totals, grouped):
+        # (year, month) group keys come back as numpy ints; store plain ints like _apply() does
+        keys = [tuple(int(part) for part in key) if isinstance(key, tuple) else key for key in grouped.index]
+        sorted_totals.keys = sorted(keys)
+        sorted_totals.totals = {key: float(total) for key, total in zip(keys, grouped['sum'])}
+        sorted_totals.counts = {key: int(count) for key, count in zip(keys, grouped['count'])}
+
+    def on_change(self, changes, old_version, new_version):
+        """InventorySync listener: patches the rollups for changed records."""
+        with self._lock:
+            if changes is None or self.version != old_version:
+                # Can't patch from a state we don't hold; ensure() will rebuild
+                self.version = None
+                return
+            for _, old, new in changes:
+                if old is not None:
+                    self._apply(old, -1)
+                if new is not None:
+                    self._apply(new, 1)
+            self.version = new_version
+
+    def _apply(self, record, sign):
+        """Adds (sign=1) or removes (sign=-1) one record's contribution to every aggregate."""
+        spent = parse_money_value(record.get('Purchase Price', 0.0))
+        sold_price = parse_money_value(record.get('Sold Price', 0.0))
+        sold_day = _parse_day(record.get('Sold Date'))
+        profit = parse_money_value(record.get('Takeaway', 0.0)) - spent if sold_day else 0.0
+
+        self.total_spent += sign * spent
+        self.total_sold += sign * sold_price
+        self.total_profit += sign * profit
+        self.card_count += sign
+        if sold_day:
+            self.sold_count += sign
+            self.daily_profit.add(sold_day, profit, sign)
+
+        purchase_day = _parse_day(record.get('Date Purchased'))
+        if purchase_day:
+            self.daily_spend.add(purchase_day, spent, sign)
+            self.monthly_spend.add((purchase_day.year, purchase_day.month), spent, sign)
+
+        for name, column in GROUP_COLUMNS.items():
+            if column not in record:
+                continue
+            key = str(record[column])
+            if name == 'Sport':
+                key = sport_for_set(key)
+            totals = self.groups[name].setdefault(key, [0.0, 0.0, 0.0, 0])
+            totals[0] += sign * spent
+            totals[1] += sign * sold_price
+            totals[2] += sign * profit
+            totals[3] += sign
+            if totals[3] <= 0:
+                del self.groups[name][key]
+
+    # --- Chart/metric views ---
+    def daily_spending_frame(self):
+        """Total spent per purchase day, oldest first."""
+        with self._lock:
+            return _daily_spending_frame(list(self.daily_spend.keys), self.daily_spend.totals)
+
+    def monthly_spending_frame(self):
+        """Total spent per purchase month ('%b %Y' labels), oldest first."""
+        with self._lock:
+            return _monthly_spending_frame(list(self.monthly_spend.keys), self.monthly_spend.totals)
+
+    def cumulative_profit_frame(self):
+        """Profit per sale day and the running cumulative profit, oldest first."""
+        with self._lock:
+            keys = list(self.daily_profit.keys)
+            return _cumulative_profit_frame(keys, self.daily_profit.totals, list(self.daily_profit.running()))
+
+    def totals_by(self, group):
+        """Spent/Sold/Profit/Cards per Sport, Set or Seller."""
+        with self._lock:
+            return _group_totals_frame(group, self.groups[group])
+
+
+class CombinedRollups:
+    """Read-only Profit Tracker view adding the rollups of archived cards to the live ones.
+
+    The archived rollups only change when cards are archived, so a rerun
+    costs the live rollups' patches plus merging per-day and per-month totals.
+    It has the metric attributes and frame methods of InventoryRollups.
+    """
+
+    def __init__(self, live, archived):
+        self.live = live
+        self.archived = archived
+
+    @property
+    def total_spent(self):
+        return self.live.total_spent + self.archived.total_spent
+
+    @property
+    def total_sold(self):
+        return self.live.total_sold + self.archived.total_sold
+
+    @property
+    def total_profit(self):
+        return self.live.total_profit + self.archived.total_profit
+
+    @property
+    def card_count(self):
+        return self.live.card_count + self.archived.card_count
+
+    @property
+    def sold_count(self):
+        return self.live.sold_count + self.archived.sold_count
+
+    def _merged(self, name):
+        """Sorted keys and summed totals of one _SortedTotals attribute of both rollups."""
+        totals = {}
+        for rollups in (self.archived, self.live):
+            with rollups._lock:
+                for key, amount in getattr(rollups, name).totals.items():
+                    totals[key] = totals.get(key, 0.0) + amount
+        return sorted(totals), totals
+
+    def daily_spending_frame(self):
+        return _daily_spending_frame(*self._merged('daily_spend'))
+
+    def monthly_spending_frame(self):
+        return _monthly_spending_frame(*self._merged('monthly_spend'))
+
+    def cumulative_profit_frame(self):
+        keys, totals = self._merged('daily_profit')
+        return _cumulative_profit_frame(keys, totals, list(accumulate(totals[key] for key in keys)))
+
+    def totals_by(self, group):
+        groups = {}
+        for rollups in (self.archived, self.live):
+            with rollups._lock:
+                for key, totals in rollups.groups[group].items():
+                    merged = groups.setdefault(key, [0.0, 0.0, 0.0, 0])
+                    for i, value in enumerate(totals):
+                        merged[i] += value
+        return _group_totals_frame(group, groups)
+
+
+def _daily_spending_frame(keys, totals):
+    return pd.DataFrame({'Purchase Day': keys, 'Purchase Price_num': [totals[key] for key in keys]})
+
+
+def _monthly_spending_frame(keys, totals):
+    return pd.DataFrame({
+        'Purchase Month': [pd.Timestamp(year=y, month=m, day=1).strftime('%b %Y') for y, m in keys],
+        'Purchase Price_num': [totals[key] for key in keys],
+    })
+
+
+def _cumulative_profit_frame(keys, totals, running):
+    return pd.DataFrame({
+        'Sold Date_dt': pd.to_datetime(keys),
+        'Profit_Per_Item': [totals[key] for key in keys],
+        'Cumulative Profit': running,
+    })
+
+
+def _group_totals_frame(group, groups):
+    rows = [[key, *totals] for key, totals in groups.items()]
+    frame = pd.DataFrame(rows, columns=[group, 'Total Spent', 'Total Sold', 'Total Profit', 'Cards'])
+    return frame.sort_values('Total Spent', ascending=False, ignore_index=True)
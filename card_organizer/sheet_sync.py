@@ -0,0 +1,432 @@
+import re
+import threading
+import time
+from datetime import datetime, timezone
+
+from gspread.utils import rowcol_to_a1
+
+from snapshot import load_snapshot, save_snapshot
+
+
+# Row runs deleted per spreadsheet batch_update request
+DELETE_RUNS_PER_REQUEST = 1000
+# Columns checked before a row is written or deleted, so it never hits a different card
+IDENTITY_COLUMNS = ["Player Name", "Lot Number"]
+_NUMERIC_START = frozenset("0123456789+-. \t")
+
+
+def numericise(value):
+    """Converts a cell to int/float the way get_all_records() does, leaving other text as is.
+
+    Cells that can't start a number are skipped without trying int()/float(),
+    which keeps converting large sheets fast (and leaves words like 'nan' or
+    'Infinity' as text).
+    """
+    if not value or value[0] not in _NUMERIC_START or "_" in value:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+
+def column_letter(col):
+    """Returns the A1 column letter(s) for a 1-based column index."""
+    return rowcol_to_a1(1, col).rstrip("0123456789")
+
+
+class InventorySync:
+    """Keeps a local copy of the Inventory worksheet and only fetches what changed.
+
+    Row N of the sheet (the header being row 1) lives at index N - 2 of the
+    local copy. A poll fetches rows appended past the last known row count and
+    rows this app has edited in a single batch_get call. A full reconciliation
+    runs every `full_sync_interval` seconds to pick up edits made directly in
+    the sheet (inserted/deleted rows, hand-edited cells).
+
+    Writes queued by this app can be overlaid on the synced rows as pending
+    operations, so `records` reflects them before they reach the sheet.
+
+    `version` is only bumped when the published records change, so confirming
+    a write that was already shown as pending costs no recomputation.
+    Listeners added with add_listener() are called as
+    `listener(changes, old_version, new_version)` whenever `records` changes,
+    where `changes` is a list of (sheet row number, old record, new record)
+    tuples (None for a row that did not exist before/after), or None when
+    everything may have changed and derived state has to be rebuilt.
+
+    With a `snapshot_path`, the synced rows and their watermark (row count and
+    sync time) are saved to disk after syncs, at most every
+    `snapshot_interval` seconds. A new process starts from that snapshot and
+    reconciles with the sheet in a background thread, so the first page
+    renders without waiting for a full download. Due full reconciliations
+    also run in the background whenever there is data to show meanwhile;
+    refresh() runs one in the foreground.
+    """
+
+    def __init__(self, worksheet, poll_interval=60, full_sync_interval=900, snapshot_path=None, snapshot_interval=60):
+        self.worksheet = worksheet
+        self.poll_interval = poll_interval
+        self.full_sync_interval = full_sync_interval
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.watermark = None
+        self.last_error = None
+        self.header = []
+        self.records = []
+        self.rows = []
+        self.version = 0
+        # Count and total seconds of each kind of sync, for the performance panel
+        self.stats = {'full_syncs': 0, 'full_sync_seconds': 0.0,
+                      'incremental_syncs': 0, 'incremental_sync_seconds': 0.0}
+        self._rows = []
+        self._records = []
+        self._pending = {}
+        self._pending_indices = set()
+        self._listeners = []
+        self._edited_rows = set()
+        self._last_poll = 0.0
+        self._last_full_sync = None
+        self._last_snapshot = 0.0
+        self._confirmations = 0
+        # Bumped when rows are deleted; a full sync downloaded before that is discarded
+        self._sync_generation = 0
+        self._background_sync = None
+        self._lock = threading.RLock()
+        if snapshot_path:
+            self._load_snapshot()
+
+    def get_data(self):
+        """Returns (records, header, version), syncing with the sheet first if the local copy is stale."""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_full_sync is None or now - self._last_full_sync >= self.full_sync_interval:
+                if self.header:
+                    self._start_background_full_sync()
+                else:
+                    # Nothing to show yet, so this load has to wait for the sheet
+                    self.full_sync()
+            elif self._edited_rows or now - self._last_poll >= self.poll_interval:
+                self.incremental_sync()
+            return self.records, self.header, self.version
+
+    @property
+    def reconciling(self):
+        """True while a background full reconciliation is running."""
+        return self._background_sync is not None and self._background_sync.is_alive()
+
+    def full_sync(self):
+        """Downloads the whole worksheet and replaces the local copy."""
+        start = time.perf_counter()
+        with self._lock:
+            edited_before = set(self._edited_rows)
+            confirmations_before = self._confirmations
+            generation = self._sync_generation
+        # Fetch without holding the lock so readers keep getting the current copy meanwhile
+        values = self.worksheet.get_all_values()
+        with self._lock:
+            if generation != self._sync_generation:
+                # Rows were deleted while downloading and delete_rows() has reloaded since
+                return
+            header = values[0] if values else []
+            rows = [self._pad(row, len(header)) for row in values[1:]]
+            if header != self.header or rows != self._rows:
+                self.header = header
+                self._rows = rows
+                self._records = [self._to_record(row) for row in rows]
+                self._publish()
+            self._edited_rows -= edited_before
+            self._last_full_sync = self._last_poll = time.monotonic()
+            if self._confirmations != confirmations_before:
+                # Writes landed while downloading; poll again so they aren't missing until the next poll
+                self._last_poll = 0.0
+            self._save_snapshot(force=True)
+            self.stats['full_syncs'] += 1
+            self.stats['full_sync_seconds'] += time.perf_counter() - start
+
+    def _start_background_full_sync(self):
+        if self.reconciling:
+            return
+        self._background_sync = threading.Thread(target=self._run_background_full_sync,
+                                                 name="inventory-full-sync", daemon=True)
+        self._background_sync.start()
+
+    def _run_background_full_sync(self):
+        try:
+            self.full_sync()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = e
+            with self._lock:
+                # Retry on the next poll instead of immediately on every rerun
+                self._last_full_sync = time.monotonic() - self.full_sync_interval + self.poll_interval
+
+    def incremental_sync(self):
+        """Fetches rows appended since the last sync plus rows edited by this app."""
+        with self._lock:
+            if not self.header:
+                self.full_sync()
+                return
+            start = time.perf_counter()
+            last_col = column_letter(len(self.header))
+            tail_start = len(self._rows) + 2
+            edited = sorted(r for r in self._edited_rows if 2 <= r < tail_start)
+            ranges = [f"A{tail_start}:{last_col}"] + [f"A{r}:{last_col}{r}" for r in edited]
+            results = self.worksheet.batch_get(ranges)
+
+            rows = self._rows
+            records = self._records
+            changed = False
+            changed_indices = set()
+            for row_number, fetched in zip(edited, results[1:]):
+                row = self._pad(fetched[0] if fetched else [], len(self.header))
+                index = row_number - 2
+                if row != rows[index]:
+                    if not changed:
+                        rows, records = list(rows), list(records)
+                        changed = True
+                    rows[index] = row
+                    records[index] = self._to_record(row)
+                    changed_indices.add(index)
+
+            appended = [self._pad(row, len(self.header)) for row in results[0]]
+            if appended:
+                if not changed:
+                    rows, records = list(rows), list(records)
+                    changed = True
+                changed_indices.update(range(len(rows), len(rows) + len(appended)))
+                rows.extend(appended)
+                records.extend(self._to_record(row) for row in appended)
+
+            if changed:
+                # Copy-on-write so readers holding the previous lists never see them change
+                self._rows = rows
+                self._records = records
+                self._publish(changed_indices)
+                self._save_snapshot()
+            self._edited_rows.clear()
+            self._last_poll = time.monotonic()
+            self.stats['incremental_syncs'] += 1
+            self.stats['incremental_sync_seconds'] += time.perf_counter() - start
+
+    def expire(self):
+        """Forces the next get_data() call to poll the sheet for changes."""
+        with self._lock:
+            self._last_poll = 0.0
+
+    def refresh(self):
+        """Reconciles with the whole worksheet in the calling thread, for a user asking for fresh data.
+
+        Unlike a due reconciliation in get_data(), the caller gets the result
+        right away instead of the old data while a background thread downloads.
+        """
+        self.full_sync()
+        self.last_error = None
+
+    def delete_rows(self, rows):
+        """Deletes sheet rows (e.g. archived cards) and reloads the worksheet, since every later row moves up.
+
+        `rows` maps each sheet row number to the row as it was synced. Under
+        the lock the IDENTITY_COLUMNS of the sheet are re-read first, and
+        nothing is deleted unless every row still holds the same card, so rows
+        inserted or deleted in the sheet since the numbers were taken never
+        cost a different card. Refuses to run while writes are pending; a
+        full sync that started before the delete discards its download.
+        """
+        with self._lock:
+            if self._pending:
+                raise RuntimeError("Can't delete rows while changes are still being saved")
+            self._check_rows(rows)
+            runs = []
+            for row_number in sorted(rows):
+                if runs and runs[-1][1] == row_number - 1:
+                    runs[-1][1] = row_number
+                else:
+                    runs.append([row_number, row_number])
+            try:
+                # Bottom batch first, so the row numbers of the batches above stay valid
+                for end in range(len(runs), 0, -DELETE_RUNS_PER_REQUEST):
+                    self.worksheet.delete_row_runs(runs[max(0, end - DELETE_RUNS_PER_REQUEST):end])
+            finally:
+                # Even a failed delete may have shifted rows, so nothing read before it is valid
+                self._sync_generation += 1
+                self._edited_rows.clear()
+                self._last_full_sync = None
+            self.full_sync()
+
+    def _check_rows(self, rows):
+        """Raises RuntimeError unless each sheet row still holds the identity values of `rows`."""
+        cols = [self.header.index(name) for name in IDENTITY_COLUMNS if name in self.header]
+        if not cols:
+            raise RuntimeError("The sheet has no Player Name or Lot Number column to check rows against")
+        letters = [column_letter(col + 1) for col in cols]
+        fetched = self.worksheet.batch_get([f"{letter}2:{letter}" for letter in letters])
+        for row_number, row in rows.items():
+            for col, values in zip(cols, fetched):
+                cells = values[row_number - 2] if row_number - 2 < len(values) else []
+                if (cells[0] if cells else "") != row[col]:
+                    self._last_full_sync = None
+                    raise RuntimeError(f"Row {row_number} was changed in the sheet since it was loaded; "
+                                       "nothing was deleted")
+
+    # --- Pending (not yet flushed) writes ---
+    def add_pending_append(self, op_id, row):
+        """Shows a row that is queued for append_rows as the next row of the local copy."""
+        with self._lock:
+            self._pending[op_id] = ("append", self._pad([str(v) for v in row], len(self.header)))
+            self._publish(())
+
+    def add_pending_update(self, op_id, row_number, values):
+        """Overlays queued cell values ({column index: value}) on a row of the local copy."""
+        with self._lock:
+            self._pending[op_id] = ("update", row_number, {col: str(v) for col, v in values.items()})
+            self._publish(())
+
+    def discard_pending(self, op_ids):
+        """Drops pending operations that failed, rolling back their optimistic changes.
+
+        Returns the ids that were still pending (not yet confirmed or discarded).
+        """
+        with self._lock:
+            discarded = [op_id for op_id in op_ids if self._pending.pop(op_id, None) is not None]
+            self._publish(())
+            return discarded
+
+    def confirm_appends(self, op_ids, updated_range):
+        """Moves flushed appends into the synced rows, given the range the API reported."""
+        with self._lock:
+            appended = [self._pending.pop(op_id)[1] for op_id in op_ids if op_id in self._pending]
+            self._record_appended(appended, updated_range)
+
+    def add_appended_rows(self, rows, updated_range):
+        """Adds rows this app wrote directly with append_rows, given the range the API reported."""
+        with self._lock:
+            self._record_appended([self._pad([str(v) for v in row], len(self.header)) for row in rows],
+                                  updated_range)
+
+    def _record_appended(self, appended, updated_range):
+        self._confirmations += 1
+        match = re.search(r"(?:^|!)[A-Z]+(\d+)", updated_range or "")
+        start = int(match.group(1)) if match else None
+        changed_indices = set()
+        if start == len(self._rows) + 2:
+            changed_indices.update(range(len(self._rows), len(self._rows) + len(appended)))
+            self._rows = self._rows + appended
+            self._records = self._records + [self._to_record(row) for row in appended]
+        elif start is None or self._rows[start - 2:start - 2 + len(appended)] != appended:
+            # Someone else appended in between; reconcile rather than guess row positions
+            self._last_full_sync = None
+        self._publish(changed_indices)
+
+    def confirm_update(self, op_id):
+        """Applies a flushed update to the synced rows."""
+        with self._lock:
+            self._confirmations += 1
+            op = self._pending.pop(op_id, None)
+            changed_indices = set()
+            if op is not None:
+                _, row_number, values = op
+                index = row_number - 2
+                if 0 <= index < len(self._rows):
+                    row = list(self._rows[index])
+                    for col, value in values.items():
+                        row[col - 1] = value
+                    self._rows = list(self._rows)
+                    self._records = list(self._records)
+                    self._rows[index] = row
+                    self._records[index] = self._to_record(row)
+                    changed_indices.add(index)
+                self._edited_rows.add(row_number)
+            self._publish(changed_indices)
+
+    def add_listener(self, listener):
+        """Registers a callable notified of every change to `records` (see the class docstring)."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def _publish(self, changed_indices=None):
+        """Rebuilds the public rows/records from the synced rows plus pending writes.
+
+        `changed_indices` are the synced row indices that changed (None if
+        everything may have); rows touched by pending writes are added here.
+        """
+        old_records, old_version = self.records, self.version
+        old_pending_indices = self._pending_indices
+        rows, records = self._rows, self._records
+        pending_indices = set()
+        if self._pending:
+            rows, records = list(rows), list(records)
+            for op in self._pending.values():
+                if op[0] == "append":
+                    pending_indices.add(len(rows))
+                    rows.append(op[1])
+                    records.append(self._to_record(op[1]))
+                elif 0 <= op[1] - 2 < len(rows):
+                    index = op[1] - 2
+                    row = list(rows[index])
+                    for col, value in op[2].items():
+                        row[col - 1] = value
+                    rows[index] = row
+                    records[index] = self._to_record(row)
+                    pending_indices.add(index)
+        self.rows = rows
+        self.records = records
+        self._pending_indices = pending_indices
+
+        changes = None
+        if changed_indices is not None:
+            changes = []
+            for index in sorted(set(changed_indices) | old_pending_indices | pending_indices):
+                old = old_records[index] if index < len(old_records) else None
+                new = records[index] if index < len(records) else None
+                if old != new:
+                    changes.append((index + 2, old, new))
+            if not changes and len(records) == len(old_records):
+                # E.g. a confirmed write that was already shown as pending: nothing derived is stale
+                return
+        self.version += 1
+        for listener in self._listeners:
+            listener(changes, old_version, self.version)
+
+    # --- On-disk snapshot ---
+    def _load_snapshot(self):
+        snapshot = load_snapshot(self.snapshot_path)
+        if snapshot is None:
+            return
+        header, rows, watermark = snapshot
+        if watermark.get("row_count") != len(rows):
+            return
+        self.header = header
+        self._rows = [self._pad(row, len(header)) for row in rows]
+        self._records = [self._to_record(row) for row in self._rows]
+        self.watermark = watermark
+        self._publish()
+
+    def _save_snapshot(self, force=False):
+        """Saves the synced rows (never pending writes) if the last save is old enough."""
+        if not self.snapshot_path or (not force and time.monotonic() - self._last_snapshot < self.snapshot_interval):
+            return
+        self.watermark = {
+            "row_count": len(self._rows),
+            "synced_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        try:
+            save_snapshot(self.snapshot_path, self.header, self._rows, self.watermark)
+        except OSError as e:
+            self.last_error = e
+        self._last_snapshot = time.monotonic()
+
+    def _to_record(self, row):
+        """Converts raw cell values to a record dict the same way get_all_records() does."""
+        return dict(zip(self.header, map(numericise, row)))
+
+    @staticmethod
+    def _pad(row, width):
+        """Pads a row with blanks to the header width (the API trims trailing empty cells)."""
+        row = list(row[:width])
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+        return row
@@ -0,0 +1,252 @@
+import copy
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from gspread.exceptions import APIError
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# Google Sheets API default per-user quotas: 60 read and 60 write requests per minute
+READ_QUOTA_PER_MINUTE = 60
+WRITE_QUOTA_PER_MINUTE = 60
+
+
+def error_status(error):
+    """Returns the HTTP status code of a gspread APIError (None for other errors)."""
+    if isinstance(error, APIError):
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None) or getattr(error, 'code', None)
+    return None
+
+
+def is_retryable(error):
+    """True for rate limits, server errors and dropped connections."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    return error_status(error) in RETRY_STATUS_CODES
+
+
+def is_rate_limited(error):
+    """True for 429 responses, which the API rejects before applying anything."""
+    return error_status(error) == 429
+
+
+class TokenBucket:
+    """Allows `rate_per_minute` acquisitions in any 60 seconds, spread out with bursts of up to `capacity`.
+
+    Tokens refill at an even rate, so a burst can't use up the minute's
+    quota at once, and an acquisition also waits while `rate_per_minute`
+    were taken in the last 60 seconds, so no rolling minute goes over the
+    quota however the refills and bursts line up.
+    """
+
+    def __init__(self, rate_per_minute, capacity=10):
+        self.limit = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.capacity = min(capacity, rate_per_minute)
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Takes one token, sleeping until one is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._forget_before(now - 60)
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if len(self._recent) >= self.limit:
+                    delay = self._recent[0] + 60 - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self._recent.append(now)
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def used_last_minute(self):
+        """Number of tokens taken in the last 60 seconds, i.e. the quota used in the current window."""
+        with self._lock:
+            self._forget_before(time.monotonic() - 60)
+            return len(self._recent)
+
+    def _forget_before(self, cutoff):
+        while self._recent and self._recent[0] <= cutoff:
+            self._recent.popleft()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SheetsClient:
+    """Quota-aware wrapper around a gspread Worksheet.
+
+    - Identical reads issued concurrently share one in-flight request, as
+      long as no write was made in between: a read issued after a write
+      never joins one that started before it.
+    - Every request takes a token from the read or write bucket first, so the
+      app slows down before Google starts answering 429.
+    - 429/5xx responses and dropped connections are retried with full-jitter
+      exponential backoff. Appends are only retried on 429: a 5xx, timeout
+      or dropped connection may come after the rows were written, and
+      appending them again would duplicate the cards.
+
+    It exposes the Worksheet methods the sync layer and write queue use, and
+    works the same against fake_worksheet.FakeWorksheet.
+    """
+
+    def __init__(self, worksheet, max_retries=5, base_delay=1.0, max_delay=32.0,
+                 read_quota=READ_QUOTA_PER_MINUTE, write_quota=WRITE_QUOTA_PER_MINUTE):
+        self.worksheet = worksheet
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.read_bucket = TokenBucket(read_quota)
+        self.write_bucket = TokenBucket(write_quota)
+        self.stats = {'reads': 0, 'writes': 0, 'coalesced': 0, 'retries': 0, 'throttled_seconds': 0.0,
+                      'api_seconds': 0.0}
+        # Per Worksheet method: {'calls', 'errors', 'seconds'}
+        self.method_stats = {}
+        # Bumped after every write; part of the key reads are merged on
+        self._write_generation = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    # --- Reads ---
+    def get_all_values(self):
+        return self._read(('get_all_values',), self.worksheet.get_all_values)
+
+    def batch_get(self, ranges):
+        ranges = list(ranges)
+        return self._read(('batch_get', tuple(ranges)), lambda: self.worksheet.batch_get(ranges))
+
+    def row_values(self, row):
+        return self._read(('row_values', row), lambda: self.worksheet.row_values(row))
+
+    # --- Writes ---
+    def append_rows(self, rows):
+        return self._write('append_rows', lambda: self.worksheet.append_rows(rows), retryable=is_rate_limited)
+
+    def batch_update(self, data):
+        return self._write('batch_update', lambda: self.worksheet.batch_update(data))
+
+    def delete_row_runs(self, runs):
+        """Deletes runs of rows [(first, last), ...] (1-based, inclusive) in one spreadsheet batch_update.
+
+        Runs are deleted bottom first so the row numbers of the others stay
+        valid. Never retried: a request that failed after reaching the server
+        may already have deleted the rows, and deleting again would hit the rows
+        that moved up into their place.
+        """
+        requests = [{"deleteDimension": {"range": {"sheetId": self.worksheet.id, "dimension": "ROWS",
+                                                   "startIndex": first - 1, "endIndex": last}}}
+                    for first, last in sorted(runs, reverse=True)]
+        return self._write('delete_rows', lambda: self.worksheet.spreadsheet.batch_update({"requests": requests}),
+                           max_retries=0)
+
+    # --- Spreadsheet ---
+    def worksheets(self):
+        """Lists the worksheets of the spreadsheet the worksheet belongs to."""
+        return self._read(('worksheets',), self.worksheet.spreadsheet.worksheets)
+
+    def add_worksheet(self, title, rows, cols):
+        """Creates a worksheet in the same spreadsheet.
+
+        Only retried on 429, like appends: a request that failed after the
+        worksheet was created would fail again as a duplicate title.
+        """
+        return self._write('add_worksheet', lambda: self.worksheet.spreadsheet.add_worksheet(title=title, rows=rows,
+                                                                                             cols=cols),
+                           retryable=is_rate_limited)
+
+    def for_worksheet(self, worksheet):
+        """A client for another worksheet of the same spreadsheet, sharing this client's quota and stats."""
+        other = copy.copy(self)
+        other.worksheet = worksheet
+        other._in_flight = {}
+        return other
+
+    def _read(self, key, request):
+        with self._lock:
+            key = (self._write_generation,) + key
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+            else:
+                self.stats['coalesced'] += 1
+        if leader:
+            try:
+                call.result = self._request(self.read_bucket, 'reads', key[1], request)
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def _write(self, method, request, max_retries=None, retryable=is_retryable):
+        # Writes are never merged: two identical appends are two cards
+        try:
+            return self._request(self.write_bucket, 'writes', method, request, max_retries, retryable)
+        finally:
+            # Even a failed write may have reached the sheet, so reads in flight are stale from now on
+            with self._lock:
+                self._write_generation += 1
+
+    def method_stats_copy(self):
+        """Returns a copy of method_stats taken under the lock, safe to iterate while requests run."""
+        with self._lock:
+            return {method: dict(stats) for method, stats in self.method_stats.items()}
+
+    def quota_usage(self):
+        """Returns {'reads': (used, limit), 'writes': (used, limit)} for the last minute."""
+        return {'reads': (self.read_bucket.used_last_minute(), self.read_bucket.limit),
+                'writes': (self.write_bucket.used_last_minute(), self.write_bucket.limit)}
+
+    def _request(self, bucket, counter, method, request, max_retries=None, retryable=is_retryable):
+        max_retries = self.max_retries if max_retries is None else max_retries
+        attempt = 0
+        while True:
+            waited = bucket.acquire()
+            with self._lock:
+                self.stats[counter] += 1
+                self.stats['throttled_seconds'] += waited
+            start = time.perf_counter()
+            try:
+                result = request()
+            except Exception as e:
+                self._record_call(method, time.perf_counter() - start, failed=True)
+                if attempt >= max_retries or not retryable(e):
+                    raise
+            else:
+                self._record_call(method, time.perf_counter() - start, failed=False)
+                return result
+            with self._lock:
+                self.stats['retries'] += 1
+            time.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt)))
+            attempt += 1
+
+    def _record_call(self, method, seconds, failed):
+        with self._lock:
+            stats = self.method_stats.setdefault(method, {'calls': 0, 'errors': 0, 'seconds': 0.0})
+            stats['calls'] += 1
+            stats['errors'] += failed
+            stats['seconds'] += seconds
+            self.stats['api_seconds'] += seconds
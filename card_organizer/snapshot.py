@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow is optional; snapshots fall back to JSON
+    pa = None
+
+ARROW_MAGIC = b"ARROW1"
+
+
+def save_snapshot(path, header, rows, watermark):
+    """Writes the synced sheet rows and their sync watermark to `path`, atomically.
+
+    With pyarrow the snapshot is an uncompressed Arrow IPC file (one string
+    column per sheet column, header and watermark in the schema metadata), so
+    it can be memory-mapped on load. Without pyarrow it is plain JSON.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            if pa is not None:
+                columns = list(zip(*rows)) if rows else [()] * len(header)
+                table = pa.table(
+                    {f"c{i}": pa.array(column, type=pa.string()) for i, column in enumerate(columns)},
+                    metadata={"header": json.dumps(header), "watermark": json.dumps(watermark)},
+                )
+                with pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+            else:
+                f.write(json.dumps({"header": header, "rows": rows, "watermark": watermark}).encode("utf-8"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_snapshot(path):
+    """Returns (header, rows, watermark) from a snapshot file, or None if there is no usable snapshot."""
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(len(ARROW_MAGIC))
+        if magic == ARROW_MAGIC:
+            if pa is None:
+                return None
+            with pa.memory_map(path) as source:
+                table = pa.ipc.open_file(source).read_all()
+            metadata = table.schema.metadata or {}
+            header = json.loads(metadata[b"header"])
+            watermark = json.loads(metadata[b"watermark"])
+            rows = [list(row) for row in zip(*(column.to_pylist() for column in table.columns))]
+        else:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            header, rows, watermark = data["header"], data["rows"], data["watermark"]
+    except (OSError, ValueError, KeyError):
+        return None
+    return header, rows, watermark
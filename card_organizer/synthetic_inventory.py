@@ -0,0 +1,104 @@
+from datetime import date
+
+import numpy as np
+
+from card_definitions import baseball_parallels, baseball_sets, football_parallels, football_sets
+
+# Inventory sheet columns: what the Add tab writes, then the sale columns the Update tab fills in
+INVENTORY_HEADER = ['Player Name', 'Set Name', 'Numbered', 'Auto', 'Patch', 'Year', 'Graded', 'Website',
+                    'Seller Name', 'Purchase Price', 'Date Purchased', 'Listed', 'Lot Number',
+                    'Sold Date', 'Sold Price', 'Takeaway']
+
+FIRST_NAMES = ["Aaron", "Bobby", "CJ", "Caleb", "Corbin", "Elly", "Gunnar", "Jackson", "Jalen", "Jayden",
+               "Joe", "Josh", "Julio", "Justin", "Ken", "Kyle", "Lamar", "Marcus", "Mike", "Patrick",
+               "Paul", "Ronald", "Shohei", "Tom", "Travis", "Tyreek", "Vladimir", "Wander", "Walker", "Zach"]
+LAST_NAMES = ["Acuna", "Allen", "Brady", "Burrow", "Carroll", "Chase", "Daniels", "De La Cruz", "Griffey",
+              "Guerrero", "Henderson", "Herbert", "Hill", "Hurts", "Jackson", "Jefferson", "Judge", "Kelce",
+              "Mahomes", "Nabers", "Ohtani", "Rodriguez", "Skenes", "Soto", "Stroud", "Tatum", "Trout",
+              "Williams", "Witt", "Young"]
+WEBSITES = ["eBay", "COMC", "Whatnot", "Facebook", "Card Show", "Local Shop"]
+SELLER_NAMES = [f"seller_{i:03d}" for i in range(200)]
+START_DATE = date(2019, 1, 1)
+END_DATE = date(2025, 6, 30)
+
+
+def _money(amounts):
+    return list(map("${:.2f}".format, amounts.tolist()))
+
+
+def _dates(dates):
+    # Few distinct days, so format each day once
+    days, inverse = np.unique(dates, return_inverse=True)
+    return np.array(days.astype(str).tolist(), dtype=object)[inverse]
+
+
+def _where_sold(sold, values):
+    column = np.full(len(sold), "", dtype=object)
+    column[sold] = values
+    return column.tolist()
+
+
+def generate_inventory(row_count, seed=0, sold_fraction=0.4, start=START_DATE, end=END_DATE):
+    """Returns `row_count` realistic Inventory rows as the sheet holds them (lists of strings).
+
+    Cards are drawn from the set and parallel lists in card_definitions, with
+    purchase dates spread over [start, end], lot numbers 1..row_count in
+    purchase order and about `sold_fraction` of the cards sold after purchase.
+    The same seed always gives the same rows.
+    """
+    rng = np.random.default_rng(seed)
+    n = row_count
+    sets = baseball_sets + football_sets
+    set_ids = rng.integers(0, len(sets), n)
+    is_baseball = set_ids < len(baseball_sets)
+    parallels = np.where(is_baseball,
+                         np.array(baseball_parallels, dtype=object)[rng.integers(0, len(baseball_parallels), n)],
+                         np.array(football_parallels, dtype=object)[rng.integers(0, len(football_parallels), n)])
+    # Most cards are base cards
+    parallels[rng.random(n) < 0.5] = "Base"
+
+    span = (end - start).days
+    purchase_days = np.sort(rng.integers(0, span + 1, n))
+    purchase_dates = np.datetime64(start) + purchase_days
+    purchase_prices = np.round(rng.lognormal(2.5, 1.0, n), 2)
+
+    sold = rng.random(n) < sold_fraction
+    # Cards can't sell before they were bought or after the end of the range
+    sold_days = purchase_days + (rng.random(n) * (span - purchase_days + 1)).astype(int)
+    sold_dates = np.datetime64(start) + sold_days
+    sold_prices = np.round(purchase_prices * rng.lognormal(0.2, 0.5, n), 2)
+    takeaways = np.round(sold_prices * 0.87, 2)
+
+    names = np.array([f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES], dtype=object)
+    players = names[rng.integers(0, len(names), n)].tolist()
+    years = rng.integers(2015, 2026, n)
+    yes_no = np.array(["No", "Yes"])
+    flags = {column: yes_no[(rng.random(n) < chance).astype(int)]
+             for column, chance in [('Auto', 0.15), ('Patch', 0.1), ('Graded', 0.2), ('Listed', 0.3)]}
+    websites = np.array(WEBSITES, dtype=object)[rng.integers(0, len(WEBSITES), n)]
+    sellers = np.array(SELLER_NAMES, dtype=object)[rng.integers(0, len(SELLER_NAMES), n)]
+
+    columns = [
+        players,
+        np.array(sets, dtype=object)[set_ids].tolist(),
+        parallels.tolist(),
+        flags['Auto'].tolist(),
+        flags['Patch'].tolist(),
+        years.astype(str).tolist(),
+        flags['Graded'].tolist(),
+        websites.tolist(),
+        sellers.tolist(),
+        _money(purchase_prices),
+        _dates(purchase_dates).tolist(),
+        flags['Listed'].tolist(),
+        np.arange(1, n + 1).astype(str).tolist(),
+        _where_sold(sold, _dates(sold_dates[sold])),
+        _where_sold(sold, _money(sold_prices[sold])),
+        _where_sold(sold, _money(takeaways[sold])),
+    ]
+    return list(map(list, zip(*columns)))
+
+
+def generate_sheet_values(row_count, seed=0, **kwargs):
+    """Header plus generate_inventory() rows, ready for fake_worksheet.FakeWorksheet."""
+    return [list(INVENTORY_HEADER)] + generate_inventory(row_count, seed=seed, **kwargs)
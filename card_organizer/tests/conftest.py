@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# The app's modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_worksheet import FakeSpreadsheet, FakeWorksheet  # noqa: E402
+from inventory_services import InventoryServices  # noqa: E402
+from synthetic_inventory import generate_sheet_values  # noqa: E402
+
+
+@pytest.fixture
+def worksheet():
+    worksheet = FakeWorksheet(generate_sheet_values(300, seed=7))
+    FakeSpreadsheet([worksheet])
+    return worksheet
+
+
+@pytest.fixture
+def services(worksheet):
+    """The app's wiring over `worksheet`, loaded, with no waiting for quota or between retries and no background
+    flushes."""
+    services = InventoryServices(worksheet, read_quota=10 ** 9, write_quota=10 ** 9)
+    services.client.base_delay = 0
+    services.write_queue.retry_delay = 0
+    services.write_queue.flush_interval = 3600
+    services.sync.get_data()
+    return services
+
+
+@pytest.fixture
+def card_row():
+    """Builds a new Inventory row as the Add tab writes it."""
+    def build(lot_number, player="Test Player"):
+        return [player, "Prizm", "Silver", "No", "No", 2024, "No", "eBay", "seller_001", "$12.50", "2025-06-01",
+                "No", lot_number]
+    return build
@@ -0,0 +1,118 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+from gspread.exceptions import APIError
+
+from bulk_import import (UnconfirmedImportError, assign_lot_numbers, count_unnumbered, import_rows,
+                         parse_pasted_table, validate_import)
+
+TODAY = date(2025, 6, 30)
+
+
+def cards(*rows):
+    return pd.DataFrame(rows, columns=['player', 'Set', 'Parallel', 'Year', 'Price', 'Date', 'Auto', 'Lot'])
+
+
+def test_valid_cards_become_inventory_rows():
+    rows, errors = validate_import(cards(
+        ["Mike Trout", "Topps Chrome", "/99", "2021", "$1,250.00", "2025-06-01", "y", "17"],
+        ["Josh Allen", "Prizm", "", "", "", "", "", ""],
+    ), today=TODAY)
+
+    assert errors == []
+    assert rows == [
+        ["Mike Trout", "Topps Chrome", "/99", "Yes", "No", 2021, "No", "", "", "$1250.00", "2025-06-01", "No", 17],
+        ["Josh Allen", "Prizm", "Base", "No", "No", 2025, "No", "", "", "$0.00", "2025-06-30", "No", None],
+    ]
+
+
+@pytest.mark.parametrize("card, problem", [
+    (["", "Prizm", "", "", "", "", "", ""], "Player Name cannot be empty"),
+    (["A", "Nope", "", "", "", "", "", ""], "Unknown set 'Nope'"),
+    (["A", "Prizm", "/499", "", "", "", "", ""], "'/499' is not a parallel of Prizm"),
+    (["A", "Prizm", "", "1900", "", "", "", ""], "Invalid year '1900'"),
+    (["A", "Prizm", "", "1e400", "", "", "", ""], "Invalid year '1e400'"),
+    (["A", "Prizm", "", "", "-5", "", "", ""], "Invalid purchase price '-5'"),
+    (["A", "Prizm", "", "", "inf", "", "", ""], "Invalid purchase price 'inf'"),
+    (["A", "Prizm", "", "", "nan", "", "", ""], "Invalid purchase price 'nan'"),
+    (["A", "Prizm", "", "", "", "someday", "", ""], "Invalid date 'someday'"),
+    (["A", "Prizm", "", "", "", "", "maybe", ""], "Auto must be Yes or No, not 'maybe'"),
+    (["A", "Prizm", "", "", "", "", "", "1e400"], "Invalid lot number '1e400'"),
+    (["A", "Prizm", "", "", "", "", "", "lot 5"], "Invalid lot number 'lot 5'"),
+])
+def test_invalid_cards_are_rejected_with_their_line(card, problem):
+    rows, errors = validate_import(cards(["Fine", "Prizm", "", "", "", "", "", ""], card), today=TODAY)
+
+    assert len(rows) == 1
+    assert errors == [(3, problem)]
+
+
+def test_missing_columns_reject_the_whole_file():
+    rows, errors = validate_import(pd.DataFrame({'Player Name': ["A"]}), today=TODAY)
+
+    assert rows == []
+    assert errors == [(0, "Missing column(s): Set Name")]
+
+
+def test_duplicate_and_used_lot_numbers_are_rejected():
+    rows, errors = validate_import(cards(
+        ["A", "Prizm", "", "", "", "", "", "5"],
+        ["B", "Prizm", "", "", "", "", "", "5.0"],
+        ["C", "Prizm", "", "", "", "", "", "7"],
+        ["D", "Prizm", "", "", "", "", "", "8"],
+    ), is_lot_used={7}.__contains__, today=TODAY)
+
+    assert [row[0] for row in rows] == ["A", "D"]
+    assert errors == [(3, "Lot number 5 is already used"), (4, "Lot number 7 is already used")]
+
+
+def test_unnumbered_cards_get_one_consecutive_block():
+    rows, _ = validate_import(parse_pasted_table(
+        "Player Name\tSet Name\tLot Number\nA\tPrizm\t\nB\tPrizm\t40\nC\tPrizm\t\nD\tPrizm\t\n"), today=TODAY)
+
+    assert count_unnumbered(rows) == 3
+    numbered = assign_lot_numbers(rows, 100)
+    assert [row[-1] for row in numbered] == [100, 40, 101, 102]
+    # The validated rows are left as they were
+    assert [row[-1] for row in rows] == [None, 40, None, None]
+
+
+def players(worksheet):
+    return [row[0] for row in worksheet.values]
+
+
+def test_batch_whose_response_was_lost_is_not_reported_as_failed(services, worksheet, card_row):
+    rows = [card_row(2000 + i, player=f"Imported {i}") for i in range(5)]
+    worksheet.lose_next()
+
+    assert import_rows(services.client, services.sync, rows, batch_size=2) == 5
+
+    assert all(players(worksheet).count(f"Imported {i}") == 1 for i in range(5))
+    assert len(services.sync.rows) == len(worksheet.values) - 1
+    assert [row[0] for row in services.sync.rows[-5:]] == [f"Imported {i}" for i in range(5)]
+
+
+def test_batch_that_did_not_land_raises_its_error(services, worksheet, card_row):
+    rows = [card_row(2000 + i, player=f"Imported {i}") for i in range(4)]
+    progress = []
+    # Rejected before anything was written
+    worksheet.fail_next(400)
+
+    with pytest.raises(APIError):
+        import_rows(services.client, services.sync, rows, batch_size=2, progress=lambda *args: progress.append(args))
+
+    assert progress == []
+    assert not any(player.startswith("Imported") for player in players(worksheet))
+
+
+def test_batch_that_could_not_be_checked_is_reported_as_unconfirmed(services, worksheet, card_row):
+    rows = [card_row(2000 + i, player=f"Imported {i}") for i in range(2)]
+    # The append fails, and so does looking it up
+    worksheet.fail_next(503)
+    worksheet.fail_next(400)
+
+    with pytest.raises(UnconfirmedImportError) as raised:
+        import_rows(services.client, services.sync, rows)
+
+    assert raised.value.rows == rows
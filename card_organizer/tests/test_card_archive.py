@@ -0,0 +1,28 @@
+from datetime import date
+
+
+def test_archive_worksheet_listing_is_retried(services, worksheet):
+    worksheet.spreadsheet.fail_next(429)
+
+    services.load_archive()
+
+    assert worksheet.spreadsheet.calls["worksheets"] == 2
+    stats = services.client.method_stats_copy()["worksheets"]
+    assert (stats['calls'], stats['errors']) == (2, 1)
+
+
+def test_archiving_goes_through_the_client(services, worksheet):
+    spreadsheet = worksheet.spreadsheet
+    services.load_archive()
+    writes = services.client.stats['writes']
+
+    archived = services.archive.archive_sold_cards(services.sync, date(2100, 1, 1))
+
+    years = spreadsheet.calls["add_worksheet"]
+    assert archived > 0
+    assert archived == services.archive.card_count
+    assert len(spreadsheet._worksheets) == years + 1
+    # One new worksheet and one append per sale year, then the Inventory delete
+    assert services.client.stats['writes'] == writes + 2 * years + 1
+    sold_date, lot = services.sync.header.index('Sold Date'), services.sync.header.index('Lot Number')
+    assert not any(row[sold_date] and row[lot] for row in services.sync.rows)
@@ -0,0 +1,163 @@
+import math
+import threading
+
+import pandas as pd
+import pytest
+
+from card_search import CardSearchIndex
+from inventory_frame import build_typed_inventory
+from rollups import GROUP_COLUMNS, InventoryRollups
+
+QUERIES = ["", "prizm", "silver 2024", "test player", "seller_001", "1001", "zzz no match"]
+
+
+def rebuilt_rollups(sync):
+    rollups = InventoryRollups()
+    rollups.rebuild(build_typed_inventory(sync.records, sync.header))
+    return rollups
+
+
+def assert_same_rollups(patched, rebuilt):
+    for name in ('total_spent', 'total_sold', 'total_profit'):
+        assert getattr(patched, name) == pytest.approx(getattr(rebuilt, name)), name
+    assert patched.card_count == rebuilt.card_count
+    assert patched.sold_count == rebuilt.sold_count
+    for frame in ('daily_spending_frame', 'monthly_spending_frame', 'cumulative_profit_frame'):
+        pd.testing.assert_frame_equal(getattr(patched, frame)(), getattr(rebuilt, frame)(), check_exact=False)
+    for group in GROUP_COLUMNS:
+        pd.testing.assert_frame_equal(patched.totals_by(group).sort_values(group, ignore_index=True),
+                                      rebuilt.totals_by(group).sort_values(group, ignore_index=True),
+                                      check_exact=False)
+
+
+def assert_same_search(patched, records):
+    rebuilt = CardSearchIndex()
+    rebuilt.rebuild(records)
+    for query in QUERIES:
+        assert patched.search(query, page_size=len(records)) == rebuilt.search(query, page_size=len(records)), query
+
+
+def load(services):
+    records, header, version = services.sync.get_data()
+    services.rollups.ensure(build_typed_inventory(records, header), version)
+    services.search_index.ensure(records, version)
+
+
+def sell(sold_date):
+    return {'Sold Date': sold_date, 'Sold Price': "$40.00", 'Takeaway': "$34.10"}
+
+
+def test_patched_rollups_and_search_match_a_rebuild(services, worksheet, card_row):
+    sync, queue = services.sync, services.write_queue
+    load(services)
+
+    # Writes from this app, with dates in the formats people type into the sheet
+    queue.enqueue_update(4, sell("2025-07-01"))
+    queue.enqueue_update(9, sell("7/2/2025"))
+    queue.enqueue_update(12, {'Purchase Price': "$3.25", 'Date Purchased': "2025-01-05 14:30"})
+    queue.enqueue_append(card_row(1001))
+    queue.enqueue_append(card_row(1002, player="Another Player"))
+    assert_same_rollups(services.rollups, rebuilt_rollups(sync))
+    queue.drain()
+    # Rows appended by someone else, picked up by the next poll
+    worksheet.append_rows([card_row(1003, player="Sheet Player"), card_row("", player="No Lot")])
+    sync.expire()
+    load(services)
+
+    assert services.rollups.version == sync.version, "the rollups were rebuilt instead of patched"
+    assert services.search_index.version == sync.version, "the search index was rebuilt instead of patched"
+    assert sync.records[-1]['Player Name'] == "No Lot"
+    assert_same_rollups(services.rollups, rebuilt_rollups(sync))
+    assert_same_search(services.search_index, sync.records)
+
+
+def test_rolled_back_update_restores_rollups_and_search(services, worksheet):
+    sync, queue = services.sync, services.write_queue
+    load(services)
+
+    queue.enqueue_update(6, {'Player Name': "Renamed Player", 'Purchase Price': "$999.00"})
+    worksheet.values[5][0] = "Someone Else"
+    queue.drain()
+    load(services)
+
+    assert queue.failures and queue.failures[0]["conflict"]
+    assert_same_rollups(services.rollups, rebuilt_rollups(sync))
+    assert_same_search(services.search_index, sync.records)
+    assert services.search_index.search("renamed")[1] == 0
+
+
+def test_card_key_follows_the_card_when_rows_move(services):
+    sync, index = services.sync, services.search_index
+    load(services)
+    key = index.card_key(10)
+    lot = sync.records[8]['Lot Number']
+    assert key == ('lot', lot)
+
+    sync.delete_rows({3: sync.rows[1]})
+    load(services)
+
+    assert index.row_for_key(key) == 9
+    assert sync.records[7]['Lot Number'] == lot
+
+
+def test_delete_is_refused_when_the_row_holds_another_card(services, worksheet):
+    sync = services.sync
+    row_count = len(worksheet.values)
+    synced = list(sync.rows[4])
+    # A row inserted above it in the sheet moves the card down
+    worksheet.values.insert(3, list(worksheet.values[3]))
+
+    with pytest.raises(RuntimeError):
+        sync.delete_rows({6: synced})
+
+    assert len(worksheet.values) == row_count + 1
+
+
+def test_full_sync_started_before_a_delete_discards_its_download(services, worksheet):
+    sync = services.sync
+    started, release = threading.Event(), threading.Event()
+    download = worksheet.get_all_values
+
+    def slow_download():
+        values = download()
+        started.set()
+        release.wait()
+        return values
+
+    worksheet.get_all_values = slow_download
+    stale = threading.Thread(target=sync.full_sync)
+    stale.start()
+    started.wait()
+    worksheet.get_all_values = download
+    sync.delete_rows({2: sync.rows[0]})
+    release.set()
+    stale.join()
+
+    assert len(sync.rows) == len(worksheet.values) - 1
+    assert sync.rows == [sync._pad(row, len(sync.header)) for row in worksheet.values[1:]]
+
+
+def test_refresh_reconciles_in_the_calling_thread(services, worksheet):
+    sync = services.sync
+    worksheet.values[4][0] = "Edited In Sheet"
+    del worksheet.values[7]
+
+    sync.refresh()
+
+    assert not sync.reconciling
+    assert sync.records[3]['Player Name'] == "Edited In Sheet"
+    assert len(sync.rows) == len(worksheet.values) - 1
+
+
+def test_patched_rollups_parse_money_like_a_rebuild(services, worksheet):
+    sync, queue = services.sync, services.write_queue
+    load(services)
+
+    queue.enqueue_update(5, {'Purchase Price': "nan"})
+    queue.enqueue_update(7, {'Purchase Price': "1_000", **sell("2025-07-03")})
+    queue.enqueue_update(8, {'Takeaway': "NaN", 'Sold Date': "2025-07-04"})
+    load(services)
+
+    assert services.rollups.version == sync.version
+    assert not math.isnan(services.rollups.total_spent)
+    assert_same_rollups(services.rollups, rebuilt_rollups(sync))
@@ -0,0 +1,112 @@
+import threading
+
+import pandas as pd
+
+from inventory_frame import LOT_NUMBER_COLUMN, build_typed_inventory
+from lot_allocator import LotNumberAllocator
+
+
+def frame(*lots):
+    return pd.DataFrame({LOT_NUMBER_COLUMN: pd.array(lots, dtype='Int64')})
+
+
+def test_ensure_takes_in_the_lot_numbers_of_a_version():
+    allocator = LotNumberAllocator()
+
+    allocator.ensure(frame(3, None, 10, 7), data_version=1)
+
+    assert allocator.peek() == 11
+    assert all(allocator.is_used(lot) for lot in (3, 7, 10))
+    assert not allocator.is_used(4)
+    # The same version isn't scanned again
+    allocator.ensure(frame(50), data_version=1)
+    assert allocator.peek() == 11
+
+
+def test_blocks_are_consecutive_and_never_handed_out_twice():
+    allocator = LotNumberAllocator()
+    allocator.ensure(frame(10), data_version=1)
+
+    assert allocator.allocate(5) == 11
+    assert allocator.allocate() == 16
+    assert allocator.allocate(0) == 17
+    assert allocator.allocate() == 17
+    assert all(allocator.is_used(lot) for lot in range(11, 18))
+
+
+def test_concurrent_allocations_get_distinct_numbers():
+    allocator = LotNumberAllocator()
+    results = []
+    lock = threading.Lock()
+
+    def allocate():
+        for _ in range(200):
+            lot = allocator.allocate()
+            with lock:
+                results.append(lot)
+
+    threads = [threading.Thread(target=allocate) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == list(range(1, 1601))
+
+
+def test_claim_and_release():
+    allocator = LotNumberAllocator()
+    allocator.ensure(frame(5), data_version=1)
+
+    assert not allocator.claim(5)
+    assert allocator.claim(20)
+    assert not allocator.claim(20)
+    assert allocator.peek() == 21
+
+    allocator.release([20])
+    assert not allocator.is_used(20)
+    assert allocator.claim(20)
+    # A released number is never allocated again, only claimable
+    allocator.release([20])
+    assert allocator.allocate() == 21
+
+
+def test_reserve_takes_in_archived_lot_numbers():
+    allocator = LotNumberAllocator()
+    allocator.ensure(frame(5), data_version=1)
+
+    allocator.reserve({2, 40})
+
+    assert allocator.is_used(2)
+    assert allocator.allocate() == 41
+
+
+def test_on_change_keeps_up_with_the_sheet(services, worksheet, card_row):
+    sync, allocator = services.sync, services.lot_allocator
+    records, header, version = sync.get_data()
+    allocator.ensure(build_typed_inventory(records, header), version)
+    next_lot = allocator.peek()
+
+    services.write_queue.enqueue_append(card_row(next_lot + 100))
+    services.write_queue.drain()
+    # Typed into the sheet by hand, picked up by the next poll
+    worksheet.append_rows([card_row(next_lot + 200, player="Sheet Player")])
+    sync.expire()
+    sync.get_data()
+
+    assert allocator.version == sync.version
+    assert allocator.is_used(next_lot + 100) and allocator.is_used(next_lot + 200)
+    assert allocator.peek() == next_lot + 201
+
+
+def test_missed_version_is_rescanned():
+    allocator = LotNumberAllocator()
+    allocator.ensure(frame(5), data_version=1)
+
+    # A full resync can't be patched in
+    allocator.on_change(None, 1, 2)
+    assert allocator.version is None
+    allocator.ensure(frame(5, 9), data_version=2)
+
+    assert allocator.version == 2
+    assert allocator.peek() == 10
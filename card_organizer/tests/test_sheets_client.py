@@ -0,0 +1,150 @@
+import threading
+import time
+
+import pytest
+from gspread.exceptions import APIError
+
+import sheets_client
+from fake_worksheet import FakeWorksheet
+from sheets_client import SheetsClient
+
+
+def run_in_threads(count, target):
+    results = [None] * count
+
+    def run(i):
+        results[i] = target()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def wait_for_in_flight(client):
+    while not client._in_flight:
+        time.sleep(0.001)
+
+
+def test_concurrent_identical_reads_share_one_request():
+    worksheet = FakeWorksheet([["a"], ["1"]], latency=0.2)
+    client = SheetsClient(worksheet)
+
+    results = run_in_threads(3, client.get_all_values)
+
+    assert results == [[["a"], ["1"]]] * 3
+    assert worksheet.calls["get_all_values"] == 1
+    assert client.stats["coalesced"] == 2
+
+
+def test_different_reads_are_not_merged():
+    worksheet = FakeWorksheet([["a"], ["1"], ["2"]], latency=0.1)
+    client = SheetsClient(worksheet)
+
+    rows = iter([2, 3])
+
+    results = run_in_threads(2, lambda: client.row_values(next(rows)))
+
+    assert sorted(results) == [["1"], ["2"]]
+    assert worksheet.calls["row_values"] == 2
+    assert client.stats["coalesced"] == 0
+
+
+def test_read_after_write_does_not_join_older_read():
+    worksheet = FakeWorksheet([["a"], ["1"]], latency=0.3)
+    client = SheetsClient(worksheet)
+    older = threading.Thread(target=client.get_all_values)
+    older.start()
+    wait_for_in_flight(client)
+
+    worksheet.latency = 0
+    client.append_rows([["2"]])
+    values = client.get_all_values()
+    older.join()
+
+    assert values == [["a"], ["1"], ["2"]]
+    assert worksheet.calls["get_all_values"] == 2
+    assert client.stats["coalesced"] == 0
+
+
+def test_retries_with_exponential_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(sheets_client.time, "sleep", sleeps.append)
+    worksheet = FakeWorksheet([["a"]])
+    client = SheetsClient(worksheet, base_delay=1.0, max_delay=3.0)
+    worksheet.fail_next(429)
+    worksheet.fail_next(503, times=2)
+
+    assert client.get_all_values() == [["a"]]
+    assert worksheet.calls["get_all_values"] == 4
+    assert client.stats["retries"] == 3
+    assert client.method_stats_copy()["get_all_values"]["errors"] == 3
+    # Full jitter: each wait is drawn from [0, min(max_delay, base_delay * 2 ** attempt)]
+    assert len(sleeps) == 3
+    assert all(0 <= delay <= limit for delay, limit in zip(sleeps, [1.0, 2.0, 3.0]))
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(sheets_client.time, "sleep", lambda seconds: None)
+    worksheet = FakeWorksheet([["a"]])
+    client = SheetsClient(worksheet, max_retries=2)
+    worksheet.fail_next(503, times=3)
+
+    with pytest.raises(APIError):
+        client.get_all_values()
+    assert worksheet.calls["get_all_values"] == 3
+
+
+def test_client_errors_are_not_retried():
+    worksheet = FakeWorksheet([["a"]])
+    client = SheetsClient(worksheet)
+    worksheet.fail_next(400)
+
+    with pytest.raises(APIError):
+        client.get_all_values()
+    assert client.stats["retries"] == 0
+
+
+def test_appends_are_only_retried_on_rate_limits(monkeypatch):
+    monkeypatch.setattr(sheets_client.time, "sleep", lambda seconds: None)
+    worksheet = FakeWorksheet([["a"]])
+    client = SheetsClient(worksheet)
+
+    worksheet.fail_next(429, times=2)
+    client.append_rows([["1"]])
+    assert worksheet.values == [["a"], ["1"]]
+
+    worksheet.fail_next(503)
+    with pytest.raises(APIError):
+        client.append_rows([["2"]])
+    assert worksheet.calls["append_rows"] == 4
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_token_bucket_never_exceeds_the_quota_in_a_rolling_minute(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sheets_client.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(sheets_client.time, "sleep", clock.sleep)
+    bucket = sheets_client.TokenBucket(60, capacity=10)
+
+    taken = []
+    for _ in range(300):
+        bucket.acquire()
+        taken.append(clock.now)
+
+    # Only the burst goes out at once; the rest is spread over the minute
+    assert taken.count(taken[0]) == 10
+    assert max(sum(1 for t in taken if start <= t < start + 60) for start in taken) <= 60
+    assert bucket.used_last_minute() <= 60
@@ -0,0 +1,154 @@
+import time
+
+import pytest
+
+from fake_worksheet import FakeWorksheet
+from inventory_services import InventoryServices
+from synthetic_inventory import generate_sheet_values
+
+
+def column(services, name):
+    return services.sync.header.index(name)
+
+
+def test_writes_show_locally_and_reach_the_sheet(services, worksheet, card_row):
+    queue, sync = services.write_queue, services.sync
+    row_count = len(worksheet.values)
+
+    queue.enqueue_append(card_row(1001))
+    queue.enqueue_update(5, {'Listed': "Yes"})
+    assert sync.rows[-1][0] == "Test Player"
+    assert sync.rows[3][column(services, 'Listed')] == "Yes"
+    assert queue.pending_count() == 2
+
+    queue.drain()
+
+    assert queue.pending_count() == 0
+    assert queue.failures == []
+    assert len(worksheet.values) == row_count + 1
+    assert worksheet.values[-1][0] == "Test Player"
+    assert worksheet.values[4][column(services, 'Listed')] == "Yes"
+
+
+def test_update_of_a_row_changed_in_the_sheet_is_rolled_back(services, worksheet):
+    queue, sync = services.write_queue, services.sync
+    sold_price = column(services, 'Sold Price')
+    before = list(sync.rows[1])
+
+    queue.enqueue_update(3, {'Sold Price': "$99.00"})
+    # Someone puts a different card in that row before the write is flushed
+    worksheet.values[2][0] = "Someone Else"
+    queue.drain()
+
+    assert len(queue.failures) == 1
+    assert queue.failures[0]["conflict"]
+    assert worksheet.values[2][sold_price] == before[sold_price]
+    assert sync.rows[1] == before
+
+
+def test_update_of_an_edited_cell_conflicts(services, worksheet):
+    queue = services.write_queue
+    sold_price = column(services, 'Sold Price')
+
+    queue.enqueue_update(4, {'Sold Price': "$99.00"})
+    worksheet.values[3][sold_price] = "$50.00"
+    queue.drain()
+
+    assert queue.failures and queue.failures[0]["conflict"]
+    assert worksheet.values[3][sold_price] == "$50.00"
+
+
+def test_append_whose_response_was_lost_is_not_written_twice(card_row):
+    worksheet = FakeWorksheet(generate_sheet_values(20))
+    services = InventoryServices(worksheet)
+    services.write_queue.retry_delay = 0
+    services.sync.get_data()
+    worksheet.lose_next()
+
+    services.write_queue.enqueue_append(card_row(999, player="Dup"))
+    services.write_queue.drain()
+
+    assert [row[0] for row in worksheet.values].count("Dup") == 1
+    assert services.write_queue.failures == []
+    assert services.sync.rows[-1][0] == "Dup"
+    assert len(services.sync.rows) == len(worksheet.values) - 1
+
+
+def test_append_that_did_not_land_is_retried(services, worksheet, card_row):
+    worksheet.fail_next(503)
+
+    services.write_queue.enqueue_append(card_row(1002))
+    services.write_queue.drain()
+
+    assert [row[0] for row in worksheet.values].count("Test Player") == 1
+    assert services.write_queue.failures == []
+
+
+def test_retried_update_that_already_landed_is_not_a_conflict():
+    worksheet = FakeWorksheet(generate_sheet_values(20))
+    services = InventoryServices(worksheet)
+    services.client.max_retries = 0
+    services.write_queue.retry_delay = 0
+    services.sync.get_data()
+    worksheet.lose_next()
+
+    services.write_queue.enqueue_update(3, {'Sold Price': "$5.00"})
+    services.write_queue.drain()
+
+    assert services.write_queue.failures == []
+    assert services.sync.rows[1][column(services, 'Sold Price')] == "$5.00"
+
+
+def test_confirming_a_write_keeps_the_data_version(services):
+    sync = services.sync
+
+    services.write_queue.enqueue_update(3, {'Listed': "Yes"})
+    version = sync.version
+    services.write_queue.drain()
+
+    assert sync.version == version
+
+
+def wait_until_saved(queue, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while queue.pending_count() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return queue.pending_count() == 0
+
+
+def test_unexpected_error_fails_the_batch_and_later_writes_still_flush(services, worksheet, card_row, monkeypatch):
+    queue, sync = services.write_queue, services.sync
+    queue.flush_interval = 0
+    confirm_appends = sync.confirm_appends
+
+    def broken_once(*args):
+        monkeypatch.setattr(sync, "confirm_appends", confirm_appends)
+        raise RuntimeError("listener bug")
+
+    monkeypatch.setattr(sync, "confirm_appends", broken_once)
+    queue.enqueue_append(card_row(1001, player="First"))
+    assert wait_until_saved(queue)
+    queue.enqueue_append(card_row(1002, player="Second"))
+    assert wait_until_saved(queue)
+
+    assert [failure["error"] for failure in queue.failures] == ["listener bug"]
+    assert worksheet.values[-1][0] == "Second"
+    sync.refresh()
+    assert sync.rows[-1][0] == "Second"
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_worker_is_restarted_if_it_dies(services, worksheet, card_row, monkeypatch):
+    queue = services.write_queue
+    queue.flush_interval = 0
+    flush_next = queue._flush_next
+
+    def broken_once():
+        monkeypatch.setattr(queue, "_flush_next", flush_next)
+        raise RuntimeError("worker bug")
+
+    monkeypatch.setattr(queue, "_flush_next", broken_once)
+    queue.enqueue_append(card_row(1001))
+
+    assert wait_until_saved(queue)
+    assert worksheet.values[-1][0] == "Test Player"
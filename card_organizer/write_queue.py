@@ -0,0 +1,227 @@
+import itertools
+import threading
+import time
+
+from gspread.utils import rowcol_to_a1
+
+from inventory_frame import LOT_COLUMN
+from sheet_sync import IDENTITY_COLUMNS, column_letter
+
+
+class WriteConflict(Exception):
+    """Raised when a sheet row no longer holds the values an update was based on."""
+
+
+def find_appended(worksheet, header, rows):
+    """Returns the sheet row a failed append of `rows` starts at if it landed after all, else None.
+
+    Looks for the rows' lot numbers (unique to each card) in the Lot Number
+    column. Raises ValueError if a row has no lot number, as there is then no
+    way to tell.
+    """
+    if LOT_COLUMN not in header:
+        raise ValueError("the sheet has no Lot Number column")
+    col = header.index(LOT_COLUMN)
+    lots = [str(row[col]).strip() if col < len(row) else "" for row in rows]
+    if not all(lots):
+        raise ValueError("a card has no lot number")
+    letter = column_letter(col + 1)
+    column = [values[0].strip() if values else "" for values in worksheet.batch_get([f"{letter}2:{letter}"])[0]]
+    # append_rows writes all of its rows or none, so the first card is enough
+    for row_number, lot in enumerate(column, start=2):
+        if lot == lots[0]:
+            return row_number
+    return None
+
+
+class WriteQueue:
+    """Applies writes to the local inventory at once and flushes them to the sheet in the background.
+
+    Each enqueued write is overlaid on the InventorySync copy straight away as a
+    pending operation. A worker thread collects queued writes into batches of up
+    to `batch_size`, sending all appends in one append_rows call and all cell
+    updates in one batch_update call, retrying with exponential backoff. Writes
+    that keep failing, or updates whose row changed in the sheet in the
+    meantime, are rolled back locally and listed in `failures`. So is a batch
+    that fails with an unexpected error (a bug, or a sync listener raising),
+    and the worker thread keeps running.
+    """
+
+    def __init__(self, worksheet, sync, batch_size=50, flush_interval=1.0, max_retries=5, retry_delay=1.0):
+        self.worksheet = worksheet
+        self.sync = sync
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.failures = []
+        self._ops = []
+        self._in_flight = 0
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def enqueue_append(self, row, description=""):
+        """Queues a new sheet row and shows it in the local copy immediately."""
+        op_id = next(self._ids)
+        self.sync.add_pending_append(op_id, row)
+        self._put({"id": op_id, "kind": "append", "row": list(row), "description": description})
+        return op_id
+
+    def enqueue_update(self, row_number, values, description=""):
+        """Queues new cell values ({column name: value}) for a sheet row and shows them immediately."""
+        header = self.sync.header
+        cols = {header.index(name) + 1: str(value) for name, value in values.items()}
+        rows = self.sync.rows
+        current = rows[row_number - 2] if 0 <= row_number - 2 < len(rows) else []
+        watched = set(cols) | {header.index(name) + 1 for name in IDENTITY_COLUMNS if name in header}
+        expected = {col: current[col - 1] if col - 1 < len(current) else "" for col in watched}
+
+        op_id = next(self._ids)
+        self.sync.add_pending_update(op_id, row_number, cols)
+        self._put({"id": op_id, "kind": "update", "row_number": row_number, "values": cols,
+                   "expected": expected, "description": description})
+        return op_id
+
+    def pending_count(self):
+        """Returns how many writes are queued or being flushed."""
+        with self._cond:
+            return len(self._ops) + self._in_flight
+
+    def clear_failures(self):
+        """Forgets reported failures once the user has seen them."""
+        with self._cond:
+            self.failures = []
+
+    def _put(self, op):
+        with self._cond:
+            self._ops.append(op)
+            if self._thread is None:
+                self._start_worker()
+            self._cond.notify()
+
+    def _start_worker(self):
+        self._thread = threading.Thread(target=self._run, name="sheet-write-queue", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._cond:
+                    while not self._ops:
+                        self._cond.wait()
+                # Give a burst of submits a moment to pile up into one batch
+                time.sleep(self.flush_interval)
+                self._flush_next()
+        finally:
+            # Should anything still escape, a new worker takes over so queued writes aren't stranded
+            with self._cond:
+                self._start_worker()
+
+    def drain(self):
+        """Writes everything queued right away, in the calling thread."""
+        while self._flush_next():
+            pass
+
+    def _flush_next(self):
+        with self._cond:
+            batch = self._ops[:self.batch_size]
+            del self._ops[:self.batch_size]
+            self._in_flight += len(batch)
+        if not batch:
+            return False
+        try:
+            self.flush(batch)
+        except Exception as e:
+            # Sheet errors are handled in flush(), so this is unexpected. Unconfirmed writes are reported (they
+            # may have reached the sheet, which the next full sync shows)
+            self._fail(batch, e)
+        finally:
+            with self._cond:
+                self._in_flight -= len(batch)
+        return True
+
+    def flush(self, batch):
+        """Writes one batch of queued operations to the sheet."""
+        appends = [op for op in batch if op["kind"] == "append"]
+        updates = [op for op in batch if op["kind"] == "update"]
+        # Appends go first so updates to freshly added cards find their rows
+        if appends:
+            self._flush_appends(appends)
+        if updates:
+            self._with_retry(self._flush_updates, updates)
+
+    def _with_retry(self, flush, ops):
+        for attempt in range(self.max_retries):
+            try:
+                flush(ops)
+                return
+            except Exception as e:
+                error = e
+                if attempt + 1 < self.max_retries:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        self._fail(ops, error)
+
+    def _flush_appends(self, ops):
+        op_ids = [op["id"] for op in ops]
+        for attempt in range(self.max_retries):
+            try:
+                response = self.worksheet.append_rows([op["row"] for op in ops])
+            except Exception as e:
+                error = e
+            else:
+                updated_range = (response or {}).get("updates", {}).get("updatedRange")
+                self.sync.confirm_appends(op_ids, updated_range)
+                return
+            # The request may have failed after the rows were written, and appending again would duplicate them
+            try:
+                landed_row = find_appended(self.worksheet, self.sync.header, [op["row"] for op in ops])
+            except Exception:
+                break
+            if landed_row is not None:
+                self.sync.confirm_appends(op_ids, f"A{landed_row}")
+                return
+            if attempt + 1 < self.max_retries:
+                time.sleep(self.retry_delay * 2 ** attempt)
+        self._fail(ops, error)
+
+    def _flush_updates(self, ops):
+        row_numbers = sorted({op["row_number"] for op in ops})
+        last_col = column_letter(len(self.sync.header))
+        fetched = self.worksheet.batch_get([f"A{r}:{last_col}{r}" for r in row_numbers])
+        current = {r: list(values[0]) if values else [] for r, values in zip(row_numbers, fetched)}
+
+        data, accepted, conflicts = [], [], []
+        for op in ops:
+            row = current[op["row_number"]]
+            row.extend([""] * (len(self.sync.header) - len(row)))
+            # A retried batch finds the cells it already wrote, which isn't a conflict
+            already_written = all(row[col - 1] == value for col, value in op["values"].items())
+            if any(row[col - 1] != value and not (already_written and col in op["values"])
+                   for col, value in op["expected"].items()):
+                conflicts.append(op)
+                continue
+            for col, value in op["values"].items():
+                data.append({"range": rowcol_to_a1(op["row_number"], col), "values": [[value]]})
+                row[col - 1] = value
+            accepted.append(op)
+
+        if data:
+            self.worksheet.batch_update(data)
+        for op in accepted:
+            self.sync.confirm_update(op["id"])
+        if conflicts:
+            self._fail(conflicts, WriteConflict("the row was changed in the sheet since it was loaded"))
+
+    def _fail(self, ops, error):
+        discarded = set(self.sync.discard_pending([op["id"] for op in ops]))
+        with self._cond:
+            for op in ops:
+                if op["id"] not in discarded:
+                    # Already confirmed, i.e. it did reach the sheet
+                    continue
+                self.failures.append({
+                    "description": op["description"],
+                    "error": str(error),
+                    "conflict": isinstance(error, WriteConflict),
+                })